@@ -9,12 +9,118 @@
 #    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #    License for the specific language governing permissions and limitations
 #    under the License.
+import collections
+import threading
+import weakref
+
 from oslo_utils import importutils
+import requests
+
+from sgsclient.common import forksafe
+
+# Client classes already imported, keyed by API version.
+_client_classes = {}
+
+
+def get_client_class(version):
+    version = str(version)
+    client_class = _client_classes.get(version)
+    if client_class is None:
+        module = importutils.import_versioned_module(
+            'sgsclient', version, 'client'
+        )
+        client_class = _client_classes[version] = getattr(module, 'Client')
+    return client_class
 
 
 def Client(version, *args, **kwargs):
-    module = importutils.import_versioned_module(
-        'sgsclient', version, 'client'
-    )
-    client_class = getattr(module, 'Client')
+    client_class = get_client_class(version)
     return client_class(*args, **kwargs)
+
+
+class ClientPool(forksafe.ProcessLocal):
+    """Cache of warm clients for many projects, regions and endpoints.
+
+    Clients are keyed by (project, region, endpoint) and the least recently
+    used one is dropped once more than ``max_size`` are held. A dropped
+    client may still be in use by threads it was handed to, so it is not
+    closed: its background token refresher, if any, stops once nothing
+    references the client any more. All clients share one connection
+    pool: the keystone ``session`` if one is given, otherwise a single
+    requests session.
+
+    :param version: API version of the clients
+    :param max_size: maximum number of clients kept
+    :param kwargs: arguments passed to every client, e.g. ``session``,
+                   ``service_type`` or ``timeout``
+    """
+
+    def __init__(self, version='1', max_size=128, **kwargs):
+        self.version = version
+        self.max_size = max_size
+        self.kwargs = kwargs
+        if 'session' not in kwargs:
+            self.kwargs.setdefault('http', requests.Session())
+        self._clients = collections.OrderedDict()
+        self._lock = threading.Lock()
+        # Weak references to evicted clients with a token refresher.
+        self._evicted = set()
+        self._check_pid()
+
+    def _after_fork(self):
+        # The clients replace their own connections; only the lock, which
+        # a thread of the parent may have held, needs replacing here.
+        self._lock = threading.Lock()
+
+    def get(self, endpoint=None, project_id=None, region_name=None,
+            **kwargs):
+        """Return the client for a project, region and endpoint.
+
+        ``kwargs``, such as a per-project ``auth`` plugin or ``token``,
+        are only used when the client is created.
+        """
+        key = (project_id, region_name, endpoint)
+        self._check_pid()
+        with self._lock:
+            client = self._clients.pop(key, None)
+            if client is None:
+                client = self._create(endpoint, project_id, region_name,
+                                      kwargs)
+            self._clients[key] = client
+            while len(self._clients) > self.max_size:
+                self._evict(self._clients.popitem(last=False)[1])
+        return client
+
+    def _evict(self, client):
+        refresher = getattr(client.http_client, 'token_refresher', None)
+        if refresher is None:
+            return
+
+        def stop_refresher(ref):
+            self._evicted.discard(ref)
+            # Not joined: this may run in any thread, during garbage
+            # collection.
+            refresher.stop(wait=False)
+
+        self._evicted.add(weakref.ref(client, stop_refresher))
+
+    def _create(self, endpoint, project_id, region_name, kwargs):
+        client_kwargs = dict(self.kwargs)
+        client_kwargs.update(kwargs)
+        if region_name is not None:
+            client_kwargs['region_name'] = region_name
+        if project_id is not None and 'session' not in client_kwargs:
+            # A SessionClient gets its project from the auth plugin.
+            client_kwargs['project_id'] = project_id
+        return Client(self.version, endpoint, **client_kwargs)
+
+    def __len__(self):
+        return len(self._clients)
+
+    def clear(self):
+        """Drop and close every client; none of them may be in use."""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            client.close()
@@ -25,17 +25,13 @@ OpenStack Client interface. Handles the REST calls and responses.
 # E0202: An attribute inherited from %s hide this method
 # pylint: disable=E0202
 
-try:
-    import simplejson as json
-except ImportError:
-    import json
-
 import time
 
 from oslo_log import log as logging
 from oslo_utils import importutils
 import requests
 
+from sgsclient.common import codec
 from sgsclient.i18n import _
 from sgsclient.openstack.common.apiclient import exceptions
 
@@ -132,7 +128,7 @@ class HTTPClient(object):
     def serialize(self, kwargs):
         if kwargs.get('json') is not None:
             kwargs['headers']['Content-Type'] = 'application/json'
-            kwargs['data'] = json.dumps(kwargs['json'])
+            kwargs['data'] = codec.dumps(kwargs['json'])
         try:
             del kwargs['json']
         except KeyError:
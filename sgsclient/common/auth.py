@@ -0,0 +1,205 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Keystone token handling shared by the sgs transports.
+"""
+
+import threading
+
+from keystoneclient.auth.identity.generic import password as ks_password
+from keystoneclient import exceptions as ks_exc
+from keystoneclient import session as ksession
+from oslo_log import log as logging
+from oslo_utils import timeutils
+
+from sgsclient.common import forksafe
+from sgsclient.openstack.common.apiclient import exceptions as exc
+
+LOG = logging.getLogger(__name__)
+
+# Seconds before expiry at which a token is treated as expired.
+STALE_TOKEN_DURATION = 30
+# Seconds before expiry at which TokenRefresher fetches a new token.
+REFRESH_MARGIN = 300
+# Seconds to wait before retrying a failed background refresh.
+REFRESH_RETRY_INTERVAL = 10
+
+
+def seconds_until_expiry(access):
+    expires = timeutils.normalize_time(access.expires)
+    return timeutils.delta_seconds(timeutils.utcnow(), expires)
+
+
+class TokenProvider(forksafe.ProcessLocal):
+    """Thread-safe holder of a token obtained from a keystone auth plugin.
+
+    The token is fetched once and reused by every thread until it is about
+    to expire or is invalidated. Only one thread at a time authenticates;
+    the others wait for it and share the new token.
+
+    :param auth: keystoneclient auth plugin
+    :param session: keystoneclient session used to authenticate
+    :param stale_duration: seconds before expiry to fetch a new token
+    """
+
+    def __init__(self, auth, session, stale_duration=STALE_TOKEN_DURATION):
+        self.auth = auth
+        self.session = session
+        self.stale_duration = stale_duration
+        self._access = None
+        self._lock = threading.Lock()
+        self._check_pid()
+
+    def _after_fork(self):
+        # The lock may have been held by a thread that only exists in the
+        # parent; the token itself is still valid.
+        self._lock = threading.Lock()
+        self.session.session = forksafe.session_for_process(
+            self.session.session)
+
+    @classmethod
+    def from_credentials(cls, auth_url, username, password, project_id=None,
+                         project_name=None, user_domain_id=None,
+                         project_domain_id=None, verify=True, cert=None,
+                         timeout=None):
+        auth = ks_password.Password(auth_url,
+                                    username=username,
+                                    password=password,
+                                    project_id=project_id,
+                                    project_name=project_name,
+                                    user_domain_id=user_domain_id or 'default',
+                                    project_domain_id=(project_domain_id or
+                                                       'default'))
+        session = ksession.Session(verify=verify, cert=cert, timeout=timeout)
+        return cls(auth, session)
+
+    def _needs_refresh(self, access):
+        return (access is None or
+                access.will_expire_soon(self.stale_duration))
+
+    @property
+    def expires(self):
+        access = self._access
+        return access.expires if access is not None else None
+
+    def get_access(self):
+        self._check_pid()
+        access = self._access
+        if self._needs_refresh(access):
+            with self._lock:
+                access = self._access
+                if self._needs_refresh(access):
+                    access = self._authenticate()
+        return access
+
+    def get_token(self):
+        return self.get_access().auth_token
+
+    def invalidate(self, token):
+        """Drop ``token`` after the server rejected it.
+
+        Nothing happens if another thread already replaced the token, so a
+        burst of 401s triggers a single re-authentication.
+        """
+        with self._lock:
+            access = self._access
+            if access is not None and access.auth_token == token:
+                self.auth.invalidate()
+                self._access = None
+
+    def refresh(self):
+        """Fetch a new token now, whether or not the current one expired."""
+        self._check_pid()
+        with self._lock:
+            self.auth.invalidate()
+            return self._authenticate()
+
+    def _authenticate(self):
+        try:
+            access = self.auth.get_access(self.session)
+        except ks_exc.ClientException as e:
+            raise exc.AuthorizationFailure("Authentication failed: %s" % e)
+        LOG.debug("Obtained token expiring at %s", access.expires)
+        self._access = access
+        return access
+
+
+class TokenRefresher(object):
+    """Renew a keystone token in a background thread ahead of its expiry.
+
+    The new token is fetched while the current one is still valid and then
+    swapped in, so requests never wait for keystone and never see an
+    expired token.
+
+    :param auth: keystoneclient identity plugin, e.g. the one of a session
+    :param session: keystoneclient session used to authenticate
+    :param margin: seconds before expiry at which to refresh; tokens
+                   that live less than that are refreshed halfway through
+                   their lifetime
+    :param retry_interval: least number of seconds between two refreshes
+    :param lock: lock held to fetch the current token, shared with the
+                 requests of a client so that they authenticate only once
+                 when there is no token yet
+    """
+
+    def __init__(self, auth, session, margin=REFRESH_MARGIN,
+                 retry_interval=REFRESH_RETRY_INTERVAL, lock=None):
+        self.auth = auth
+        self.session = session
+        self.margin = margin
+        self.retry_interval = retry_interval
+        self.lock = lock or threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run,
+                                            name='sgsclient-token-refresh')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self, wait=True):
+        self._stopped.set()
+        if wait and self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _next_refresh(self):
+        try:
+            with self.lock:
+                access = self.auth.get_access(self.session)
+        except Exception as e:
+            LOG.warning("Could not fetch a token: %s", e)
+            return self.retry_interval
+        remaining = seconds_until_expiry(access)
+        # Tokens that live less than the margin, or a clock running ahead
+        # of keystone's, would otherwise be refreshed in a busy loop.
+        return max(remaining - self.margin, remaining / 2.0,
+                   self.retry_interval)
+
+    def refresh(self):
+        # get_auth_ref() authenticates without touching the current
+        # auth_ref, which keeps being used until the new one replaces it.
+        self.auth.auth_ref = self.auth.get_auth_ref(self.session)
+        LOG.debug("Refreshed token, now expiring at %s",
+                  self.auth.auth_ref.expires)
+
+    def _run(self):
+        while not self._stopped.wait(self._next_refresh()):
+            try:
+                self.refresh()
+            except Exception as e:
+                LOG.warning("Could not refresh token: %s", e)
+                self._stopped.wait(self.retry_interval)
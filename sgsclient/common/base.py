@@ -15,12 +15,18 @@ Base utilities to build API operation managers and objects on top of.
 """
 
 import abc
+from concurrent import futures
 import copy
+import os
+import threading
+import weakref
 
 import six
 from six.moves.urllib import parse
 
 from sgsclient.common import http
+from sgsclient.common import waiter
+from sgsclient.common import watch
 from sgsclient.openstack.common.apiclient import exceptions
 from sgsclient.openstack.common.apiclient import base as common_base
 
@@ -29,6 +35,132 @@ SORT_DIR_VALUES = ('asc', 'desc')
 SORT_KEY_VALUES = ('id', 'status', 'name', 'created_at')
 SORT_KEY_MAPPINGS = {}
 
+# How attributes missing from resources of a non-detailed listing are
+# loaded: never (AttributeError), with one detailed listing for the whole
+# result set, or with one GET per resource.
+LAZY_LOAD_NEVER = 'never'
+LAZY_LOAD_BATCH = 'batch'
+LAZY_LOAD_PER_ITEM = 'per-item'
+LAZY_LOAD_POLICIES = (LAZY_LOAD_NEVER, LAZY_LOAD_BATCH, LAZY_LOAD_PER_ITEM)
+
+# Default number of pages fetched at the same time by _list_parallel().
+PARALLEL_LIST_WORKERS = 8
+
+# Encoded bodies of action requests, keyed by action name and info items.
+ACTION_BODY_CACHE_SIZE = 1024
+_action_bodies = {}
+_SCALAR_TYPES = six.string_types + six.integer_types + (float, bool)
+
+# Lazy loads are serialized per resource so that threads reading the same
+# unloaded resource send a single GET. Locks are picked by id() from a fixed
+# set rather than stored on the resource, which keeps resources picklable.
+_LOAD_LOCKS = tuple(threading.RLock() for _ in range(64))
+
+
+def _action_key(action, info):
+    # Values are keyed with their type: True, 1 and 1.0 are equal and hash
+    # the same but are encoded differently.
+    if info is None:
+        return (action, None)
+    if not isinstance(info, dict) or not all(
+            v is None or isinstance(v, _SCALAR_TYPES)
+            for v in info.values()):
+        return None
+    return (action, tuple(sorted((k, type(v), v) for k, v in info.items())))
+
+
+def _load_lock(resource):
+    return _LOAD_LOCKS[id(resource) % len(_LOAD_LOCKS)]
+
+
+def _reset_load_locks():
+    global _LOAD_LOCKS
+    _LOAD_LOCKS = tuple(threading.RLock() for _ in _LOAD_LOCKS)
+
+
+if hasattr(os, 'register_at_fork'):
+    # A lock held by another thread during fork() would stay locked forever
+    # in the child.
+    os.register_at_fork(after_in_child=_reset_load_locks)
+
+
+class _Meeting(object):
+    """IDs seen by the two ends of a bidirectional listing.
+
+    The ascending and descending walks are done once either of them gets
+    an ID the other one has already seen: together they have then listed
+    everything in between. Membership, unlike comparing IDs, does not
+    depend on the collation used by the server.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._seen = {'asc': set(), 'desc': set()}
+
+    def add(self, direction, page):
+        ids = [info['id'] for info in page]
+        other = self._seen['desc' if direction == 'asc' else 'asc']
+        with self._lock:
+            self._seen[direction].update(ids)
+            return any(i in other for i in ids)
+
+
+class _Hydration(object):
+    """Resources of one non-detailed listing, loaded all at once.
+
+    The first resource missing an attribute lists the same page again in
+    detail, and every resource of the page gets its details from that
+    single response.
+    """
+
+    def __init__(self, manager, url, response_key, resources):
+        self.manager = manager
+        self.url = url
+        self.response_key = response_key
+        self.resources = dict((r._info['id'], r) for r in resources)
+        self._lock = threading.Lock()
+
+    def hydrate(self):
+        with self._lock:
+            resources, self.resources = self.resources, {}
+            if not resources:
+                return
+            for info in self.manager._list(self.url, self.response_key,
+                                           return_raw=True):
+                resource = resources.pop(info.get('id'), None)
+                if resource is not None:
+                    resource._merge(self.manager, info, loaded=True)
+                    resource._hydration = None
+            # Resources gone since the listing fall back to a GET.
+            for resource in resources.values():
+                resource._hydration = None
+
+
+def _detail_url(url):
+    path, sep, query = url.partition('?')
+    return path.rstrip('/') + '/detail' + sep + query
+
+
+def _field_names(fields):
+    # The ID is always needed to tell resources apart.
+    names = ['id']
+    names.extend(f for f in fields if f != 'id')
+    return names
+
+
+def project(info, fields):
+    """Return ``info`` with only the given fields, and its ID.
+
+    Used when a server ignores the ``fields`` query parameter, so that the
+    resources built from the response stay as small as requested.
+    """
+    if not fields or not hasattr(info, 'items'):
+        return info
+    names = set(_field_names(fields))
+    if all(k in names for k in info):
+        return info
+    return dict((k, v) for k, v in info.items() if k in names)
+
 
 def getid(obj):
     """Abstracts the common pattern of allowing both an object or
@@ -42,6 +174,52 @@ def getid(obj):
         return obj
 
 
+def save_all(resources, max_workers=PARALLEL_LIST_WORKERS):
+    """Save many resources, sending several updates at a time.
+
+    Only resources with changes are sent, each with its changes only.
+
+    :returns: list of the resources that were updated
+    """
+    changed = [r for r in resources if r.changes()]
+    if not changed:
+        return []
+    with futures.ThreadPoolExecutor(max(max_workers, 1)) as executor:
+        saved = list(executor.map(lambda r: r.save(), changed))
+    return [r for r, sent in zip(changed, saved) if sent]
+
+
+class IdentityMap(object):
+    """One Resource instance per resource class and ID.
+
+    A resource materialized again, by a get, a listing or an action
+    response, updates the instance already in use instead of creating a
+    new one. Instances are only weakly referenced, so the map never keeps
+    resources alive.
+    """
+
+    def __init__(self):
+        self._resources = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._resources)
+
+    def materialize(self, manager, obj_class, info, loaded=False):
+        rid = info.get('id') if hasattr(info, 'get') else None
+        if rid is None:
+            return obj_class(manager, info, loaded=loaded)
+        key = (obj_class, rid)
+        with self._lock:
+            resource = self._resources.get(key)
+            if resource is None:
+                resource = obj_class(manager, info, loaded=loaded)
+                self._resources[key] = resource
+                return resource
+        resource._merge(manager, info, loaded)
+        return resource
+
+
 class Manager(common_base.HookableMixin):
     """Managers interact with a particular type of API (servers, flavors,
 
@@ -49,15 +227,28 @@ class Manager(common_base.HookableMixin):
     """
     resource_class = None
 
-    def __init__(self, api):
+    def __init__(self, api, identity_map=None, lazy_load=LAZY_LOAD_NEVER):
+        if lazy_load not in LAZY_LOAD_POLICIES:
+            raise ValueError('lazy_load must be one of the following: %s.'
+                             % ', '.join(LAZY_LOAD_POLICIES))
         self.api = api
+        self.identity_map = identity_map
+        self.lazy_load = lazy_load
         if isinstance(self.api, http.SessionClient):
             self.project_id = self.api.get_project_id()
         else:
             self.project_id = self.api.project_id
 
+    def _make_resource(self, info, loaded=False, obj_class=None):
+        """Build the resource for ``info``, through the identity map if any.
+        """
+        obj_class = obj_class or self.resource_class
+        if self.identity_map is None:
+            return obj_class(self, info, loaded=loaded)
+        return self.identity_map.materialize(self, obj_class, info, loaded)
+
     def _list(self, url, response_key=None, obj_class=None,
-              data=None, headers=None, return_raw=False,):
+              data=None, headers=None, return_raw=False, fields=None):
 
         if headers is None:
             headers = {}
@@ -72,9 +263,116 @@ class Manager(common_base.HookableMixin):
             data = body[response_key]
         else:
             data = body
+        if fields:
+            data = [project(res, fields) for res in data]
         if return_raw:
             return data
-        return [obj_class(self, res, loaded=True) for res in data if res]
+        # Attributes left out on purpose with fields are not lazy-loaded.
+        loaded = (self.lazy_load == LAZY_LOAD_NEVER or bool(fields) or
+                  url.partition('?')[0].endswith('/detail'))
+        resources = [self._make_resource(res, loaded=loaded,
+                                         obj_class=obj_class)
+                     for res in data if res]
+        if not loaded and self.lazy_load == LAZY_LOAD_BATCH:
+            unloaded = [r for r in resources
+                        if not r.is_loaded() and 'id' in r._info]
+            if unloaded:
+                hydration = _Hydration(self, _detail_url(url), response_key,
+                                       unloaded)
+                for resource in unloaded:
+                    resource._hydration = hydration
+        return resources
+
+    def _list_parallel(self, resource_type, detailed=False,
+                       search_opts=None, partitions=None, limit=None,
+                       max_workers=PARALLEL_LIST_WORKERS,
+                       bidirectional=True):
+        """List every resource, walking several pages at a time.
+
+        Marker pagination is sequential, so the listing is split into
+        walks that run concurrently: one per partition, a dict of
+        search_opts added to ``search_opts``, e.g. one per status. With
+        ``bidirectional`` each partition is walked from both ends of the
+        ID order until the two walks meet, halving its number of rounds.
+
+        :param limit: page size of each walk
+        :returns: list of resources sorted by ID within each partition;
+                  a resource in several partitions is returned once
+        """
+        walks = []
+        for partition in partitions or [{}]:
+            opts = dict(search_opts or {})
+            opts.update(partition)
+            meeting = _Meeting() if bidirectional else None
+            walks.append((opts, 'asc', meeting))
+            if bidirectional:
+                walks.append((opts, 'desc', meeting))
+
+        def walk(args):
+            return self._walk_pages(resource_type, detailed, limit, *args)
+
+        with futures.ThreadPoolExecutor(max(max_workers, 1)) as executor:
+            results = list(executor.map(walk, walks))
+
+        seen = set()
+        resources = []
+        for (opts, direction, meeting), infos in zip(walks, results):
+            if direction == 'desc':
+                infos = reversed(infos)
+            for info in infos:
+                if info['id'] not in seen:
+                    seen.add(info['id'])
+                    resources.append(self._make_resource(info,
+                                                         loaded=True))
+        return resources
+
+    def _iter_pages(self, resource_type, detailed=True, search_opts=None,
+                    marker=None, limit=None, sort=None, fields=None):
+        """Yield the pages of a listing as lists of dicts.
+
+        Each page is requested after the last ID of the previous one; the
+        server may cap the page size, so only an empty page ends it.
+        """
+        while True:
+            url = self._build_list_url(resource_type, detailed=detailed,
+                                       search_opts=search_opts,
+                                       marker=marker, limit=limit,
+                                       sort=sort, fields=fields)
+            page = self._list(url, resource_type, return_raw=True,
+                              fields=fields)
+            if not page:
+                return
+            yield page
+            marker = page[-1]['id']
+
+    def _walk_pages(self, resource_type, detailed, limit, search_opts,
+                    direction, meeting=None):
+        infos = []
+        for page in self._iter_pages(resource_type, detailed=detailed,
+                                     search_opts=search_opts, limit=limit,
+                                     sort='id:%s' % direction):
+            infos.extend(page)
+            if meeting is not None and meeting.add(direction, page):
+                break
+        return infos
+
+    def _action_body(self, action, info=None):
+        """Return the pre-encoded JSON body of an action request.
+
+        Actions sent with the same info, such as ``{"enable": null}``, are
+        encoded only once. Info with other values than strings, numbers,
+        booleans and None is encoded per call.
+        """
+        key = _action_key(action, info)
+        if key is None:
+            return http.encode_body({action: info})
+        body = _action_bodies.get(key)
+        if body is None:
+            body = http.encode_body({action: info})
+            if len(_action_bodies) >= ACTION_BODY_CACHE_SIZE:
+                _action_bodies.clear()
+            _action_bodies[key] = body
+        return body
 
     def _delete(self, url, headers=None):
         if headers is None:
@@ -90,8 +388,8 @@ class Manager(common_base.HookableMixin):
         # PUT requests may not return a body
         if body:
             if response_key:
-                return self.resource_class(self, body[response_key])
-            return self.resource_class(self, body)
+                return self._make_resource(body[response_key])
+            return self._make_resource(body)
 
     def _create(self, url, data=None, response_key=None,
                 return_raw=False, headers=None):
@@ -107,24 +405,28 @@ class Manager(common_base.HookableMixin):
                 return body[response_key]
             return body
         if response_key:
-            return self.resource_class(self, body[response_key])
-        return self.resource_class(self, body)
+            return self._make_resource(body[response_key])
+        return self._make_resource(body)
 
-    def _get(self, url, response_key=None, return_raw=False, headers=None):
+    def _get(self, url, response_key=None, return_raw=False, headers=None,
+             fields=None):
         if headers is None:
             headers = {}
+        if fields:
+            url += '?' + parse.urlencode(
+                [('fields', ','.join(_field_names(fields)))])
         resp, body = self.api.json_request('GET', url, headers=headers)
+        if response_key:
+            body = body[response_key]
+        body = project(body, fields)
         if return_raw:
-            if response_key:
-                return body[response_key]
             return body
-        if response_key:
-            return self.resource_class(self, body[response_key])
-        return self.resource_class(self, body)
+        return self._make_resource(body, loaded=bool(fields))
 
     def _build_list_url(self, resource_type, detailed=False,
                         search_opts=None, marker=None, limit=None,
-                        sort_key=None, sort_dir=None, sort=None):
+                        sort_key=None, sort_dir=None, sort=None,
+                        fields=None):
 
         if search_opts is None:
             search_opts = {}
@@ -140,6 +442,9 @@ class Manager(common_base.HookableMixin):
         if limit:
             query_params['limit'] = limit
 
+        if fields:
+            query_params['fields'] = ','.join(_field_names(fields))
+
         if sort:
             query_params['sort'] = self._format_sort_param(sort)
         else:
@@ -236,12 +541,70 @@ class Manager(common_base.HookableMixin):
 
 @six.add_metaclass(abc.ABCMeta)
 class ManagerWithFind(Manager):
-    """Manager with additional `find()`/`findall()` methods."""
+    """Manager with additional `find()`/`findall()` methods.
+
+    Managers setting ``resource_type``, the name of their resources in
+    URLs and response bodies, also get :meth:`list_parallel`,
+    :meth:`watch` and :meth:`wait_for_status`.
+    """
+
+    resource_type = None
 
     @abc.abstractmethod
     def list(self):
         pass
 
+    def list_parallel(self, detailed=False, search_opts=None,
+                      partitions=None, limit=None,
+                      max_workers=PARALLEL_LIST_WORKERS):
+        """Lists all resources, fetching several pages at the same time.
+
+        :param detailed: Whether to return detailed resource info.
+        :param search_opts: Search options to filter out resources.
+        :param partitions: List of search options, e.g. one per status,
+                           each listed concurrently with the others.
+        :param limit: Maximum number of resources per page.
+        :param max_workers: Maximum number of pages fetched at once.
+        :rtype: list of :attr:`resource_class`
+        """
+        return self._list_parallel(self.resource_type, detailed=detailed,
+                                   search_opts=search_opts,
+                                   partitions=partitions, limit=limit,
+                                   max_workers=max_workers)
+
+    def watch(self, search_opts=None, interval=watch.WATCH_INTERVAL,
+              initial=False):
+        """Poll resources and yield the changes as they happen.
+
+        :param search_opts: Search options to filter out resources.
+        :param interval: Seconds between two polls.
+        :param initial: Also yield the resources that exist when watching
+                        starts.
+        :rtype: iterator of :class:`sgsclient.common.watch.Event`
+        """
+        return iter(watch.Watcher(self, self.resource_type,
+                                  search_opts=search_opts,
+                                  interval=interval, initial=initial))
+
+    def wait_for_status(self, ids, target_states,
+                        timeout=waiter.WAIT_TIMEOUT,
+                        error_states=waiter.ERROR_STATES, search_opts=None):
+        """Wait for many resources to reach a status.
+
+        All of them are polled with a single listing per round.
+
+        :param ids: IDs of the resources to wait for.
+        :param target_states: Statuses to wait for.
+        :param timeout: Seconds after which the waits fail.
+        :param error_states: Statuses that fail the wait at once.
+        :param search_opts: Search options narrowing the listing.
+        :rtype: dict of ID to :class:`concurrent.futures.Future`
+        """
+        return waiter.StatusWaiter(self, self.resource_type, ids,
+                                   target_states, timeout=timeout,
+                                   error_states=error_states,
+                                   search_opts=search_opts).start()
+
     def find(self, **kwargs):
         """Find a single item with attributes matching ``**kwargs``.
 
@@ -288,6 +651,9 @@ class Resource(object):
     :param info: dictionary representing resource attributes
     :param loaded: prevent lazy-loading if set to True
     """
+    # Set on resources of a listing that are lazy-loaded together.
+    _hydration = None
+
     def __init__(self, manager, info, loaded=False):
         self.manager = manager
         self._info = info
@@ -298,19 +664,104 @@ class Resource(object):
         for k, v in info.items():
             setattr(self, k, v)
 
+    def _merge(self, manager, info, loaded=False, keep_changes=True):
+        """Update this resource in place with a newer copy of its info.
+
+        Attributes changed and not saved yet keep their value unless
+        ``keep_changes`` is False; the server's value only goes to
+        ``_info``, so they are still reported by :meth:`changes`.
+        """
+        with _load_lock(self):
+            changed = self.changes() if keep_changes else {}
+            merged = dict(self._info)
+            merged.update(info)
+            self._info = merged
+            self._add_details(dict((k, v) for k, v in info.items()
+                                   if k not in changed))
+            if loaded:
+                self.set_loaded(True)
+            # Keep a manager that can lazy-load, e.g. volumes materialized
+            # by ReplicateManager, which has no get().
+            if (not hasattr(self.manager, 'get') and
+                    hasattr(manager, 'get')):
+                self.manager = manager
+
+    def changes(self):
+        """Return the attributes set or replaced since the last load.
+
+        Values are compared with the info received from the server, so
+        nested dicts and lists changed in place are not noticed: assign
+        a new value instead.
+        """
+        return dict((k, v) for k, v in self.__dict__.items()
+                    if k[0] != '_' and k != 'manager' and
+                    (k not in self._info or self._info[k] != v))
+
+    def is_dirty(self):
+        return bool(self.changes())
+
+    def save(self):
+        """Send the changed attributes to the server with an update.
+
+        :returns: True if an update was sent, False if nothing changed
+        """
+        delta = self.changes()
+        if not delta:
+            return False
+        updated = self.manager.update(self.id, delta)
+        info = delta
+        if updated is not None:
+            info.update(updated._info)
+        self._merge(self.manager, info, keep_changes=False)
+        return True
+
+    def __reduce__(self):
+        # Pickle the attributes only: the manager, and the client and
+        # connections behind it, stay in this process. Attributes that
+        # are the same as in _info are not pickled twice.
+        extra = dict((k, v) for k, v in self.__dict__.items()
+                     if k not in ('manager', '_info', '_loaded',
+                                  '_hydration') and
+                     (k not in self._info or self._info[k] is not v))
+        return (self.__class__, (None, self._info, self._loaded), extra)
+
     def __setstate__(self, d):
         for k, v in d.items():
             setattr(self, k, v)
 
+    def _copy(self, copy_value):
+        # copy uses __reduce__ too, but copies stay in this process: they
+        # keep the manager to lazy-load and save with. The hydration of
+        # the listing only knows the original.
+        new = self.__class__.__new__(self.__class__)
+        for k, v in self.__dict__.items():
+            if k == 'manager':
+                new.__dict__[k] = v
+            elif k != '_hydration':
+                new.__dict__[k] = copy_value(v)
+        return new
+
+    def __copy__(self):
+        return self._copy(lambda v: v)
+
+    def __deepcopy__(self, memo):
+        return self._copy(lambda v: copy.deepcopy(v, memo))
+
     def __getattr__(self, k):
         if k not in self.__dict__:
-            # NOTE(bcwaldon): disallow lazy-loading if already loaded once
-            if not self.is_loaded():
-                self.get()
-                return self.__getattr__(k)
-            raise AttributeError(k)
-        else:
-            return self.__dict__[k]
+            hydration = self._hydration
+            if hydration is not None and not self.is_loaded():
+                # Not under our load lock: hydrate() takes the load locks
+                # of all the resources of the listing.
+                hydration.hydrate()
+            # Also taken when loaded, to wait for a load in another thread.
+            with _load_lock(self):
+                # NOTE(bcwaldon): disallow lazy-loading if already loaded once
+                if k not in self.__dict__ and not self.is_loaded():
+                    self.get()
+            if k not in self.__dict__:
+                raise AttributeError(k)
+        return self.__dict__[k]
 
     def __repr__(self):
         reprkeys = sorted(k for k in self.__dict__.keys() if k[0] != '_' and
@@ -325,8 +776,9 @@ class Resource(object):
             return
 
         new = self.manager.get(self.id)
-        if new:
-            self._add_details(new._info)
+        if new and new is not self:
+            # Through _info, so that loaded attributes are not changes.
+            self._merge(self.manager, new._info)
 
     def __eq__(self, other):
         if not isinstance(other, self.__class__):
@@ -0,0 +1,166 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Per-user on-disk cache shared by sgs invocations.
+"""
+
+import errno
+import hashlib
+import os
+import stat
+import tempfile
+import time
+
+from keystoneclient import access
+from oslo_log import log as logging
+
+from sgsclient.common import codec
+
+LOG = logging.getLogger(__name__)
+
+# Tokens are not reused once they are this close to expiry (seconds); this
+# matches the point at which keystoneclient plugins re-authenticate.
+TOKEN_EXPIRY_MARGIN = 120
+
+
+def default_cache_dir():
+    return os.environ.get('SGSCLIENT_CACHE_DIR') or os.path.join(
+        os.path.expanduser('~'), '.cache', 'sgsclient')
+
+
+def cache_key(*parts):
+    return hashlib.sha1(
+        '\0'.join(str(p or '') for p in parts).encode('utf-8')).hexdigest()
+
+
+class FileCache(object):
+    """JSON values stored in per-user files only readable by their owner.
+
+    Directories are created with mode 0700 and entries written atomically
+    with mode 0600. Entries owned by another user or readable by others
+    are ignored. Errors reading or writing the cache are logged and never
+    raised, the cache is only an optimization.
+
+    :param namespace: subdirectory of the cache directory to use
+    :param cache_dir: base directory, defaults to env[SGSCLIENT_CACHE_DIR]
+                      or ~/.cache/sgsclient
+    """
+
+    def __init__(self, namespace, cache_dir=None):
+        self.path = os.path.join(cache_dir or default_cache_dir(), namespace)
+
+    def _entry_path(self, key):
+        parts = key if isinstance(key, tuple) else (key,)
+        return os.path.join(self.path, cache_key(*parts) + '.json')
+
+    def _ensure_dir(self):
+        try:
+            os.makedirs(self.path, 0o700)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+    def get(self, key, max_age=None):
+        """Return the value stored for ``key``.
+
+        :param max_age: ignore entries older than this many seconds
+        :returns: the value, or None if missing, stale or unsafe
+        """
+        path = self._entry_path(key)
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            return None
+        try:
+            st = os.fstat(fd)
+            if (st.st_uid != os.getuid() or
+                    stat.S_IMODE(st.st_mode) & 0o077):
+                LOG.warning("Ignoring cache file %s: it is not private to "
+                            "the current user.", path)
+                return None
+            with os.fdopen(fd, 'rb') as f:
+                fd = None
+                entry = codec.loads(f.read())
+        except (OSError, IOError, ValueError) as e:
+            LOG.debug("Could not read cache file %s: %s", path, e)
+            return None
+        finally:
+            if fd is not None:
+                os.close(fd)
+        if max_age is not None and time.time() - entry['stored_at'] > max_age:
+            return None
+        return entry['value']
+
+    def set(self, key, value):
+        path = self._entry_path(key)
+        try:
+            self._ensure_dir()
+            # mkstemp creates the file with mode 0600.
+            fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(codec.dumps({'stored_at': time.time(),
+                                     'value': value}))
+            os.rename(tmp_path, path)
+        except (OSError, IOError) as e:
+            LOG.debug("Could not write cache file %s: %s", path, e)
+
+    def delete(self, key):
+        try:
+            os.unlink(self._entry_path(key))
+        except OSError:
+            pass
+
+
+class TokenCache(object):
+    """Keystone tokens and service catalogs kept between sgs invocations.
+
+    Entries are keyed by auth URL, project and user, and reused until
+    TOKEN_EXPIRY_MARGIN seconds before the token expires. Like the
+    apiclient ``keyring_saver`` hook, :meth:`save` is called with the
+    result of a successful authentication.
+    """
+
+    def __init__(self, cache_dir=None):
+        self.cache = FileCache('tokens', cache_dir)
+
+    @staticmethod
+    def key(auth_url, project, user):
+        return (auth_url, project, user)
+
+    def load(self, auth_url, project, user):
+        """Return the cached AccessInfo, or None if there is no usable one."""
+        entry = self.cache.get(self.key(auth_url, project, user))
+        if not entry:
+            return None
+        body = entry['access']
+        try:
+            if entry['version'] == 'v3':
+                auth_ref = access.AccessInfo.factory(
+                    body={'token': body}, auth_token=body['auth_token'])
+            else:
+                auth_ref = access.AccessInfo.factory(body={'access': body})
+        except (KeyError, NotImplementedError):
+            return None
+        if auth_ref.will_expire_soon(TOKEN_EXPIRY_MARGIN):
+            return None
+        return auth_ref
+
+    def save(self, auth_url, project, user, auth_ref):
+        if auth_ref is None:
+            return
+        self.cache.set(self.key(auth_url, project, user),
+                       {'version': auth_ref.version,
+                        'access': dict(auth_ref)})
+
+    def delete(self, auth_url, project, user):
+        self.cache.delete(self.key(auth_url, project, user))
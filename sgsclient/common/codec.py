@@ -0,0 +1,142 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+JSON codec shared by all sgsclient transports.
+
+The fastest available backend is selected at import time, in the order
+given by BACKENDS. The choice can be forced with env[SGSCLIENT_JSON_BACKEND]
+or :func:`set_default_backend`. Every codec encodes to UTF-8 bytes and
+decodes straight from the bytes of a response body.
+"""
+
+import json
+import os
+
+from oslo_serialization import jsonutils
+from oslo_utils import importutils
+import six
+
+BACKENDS = ('orjson', 'ujson', 'simplejson', 'json')
+
+
+class JSONCodec(object):
+    """Encode and decode JSON with the stdlib ``json`` module."""
+
+    name = 'json'
+
+    def __init__(self, module=json):
+        self.module = module
+
+    def _dumps(self, obj):
+        return self.module.dumps(obj, default=jsonutils.to_primitive)
+
+    def dumps(self, obj):
+        """Serialize ``obj`` to UTF-8 encoded JSON bytes."""
+        data = self._dumps(obj)
+        if isinstance(data, six.text_type):
+            data = data.encode('utf-8')
+        return data
+
+    def loads(self, data):
+        """Deserialize JSON from bytes, bytearray, memoryview or text."""
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        elif six.PY2 and isinstance(data, bytearray):
+            data = bytes(data)
+        return self.module.loads(data)
+
+
+class SimpleJSONCodec(JSONCodec):
+    name = 'simplejson'
+
+
+class UJSONCodec(JSONCodec):
+    name = 'ujson'
+
+    def _dumps(self, obj):
+        try:
+            return self.module.dumps(obj, ensure_ascii=False,
+                                     escape_forward_slashes=False)
+        except (TypeError, OverflowError):
+            # Older ujson releases have no ``default`` hook; let jsonutils
+            # turn datetimes and other objects into primitives.
+            return jsonutils.dumps(obj)
+
+
+class ORJSONCodec(JSONCodec):
+    name = 'orjson'
+
+    def _dumps(self, obj):
+        try:
+            return self.module.dumps(obj, default=jsonutils.to_primitive,
+                                     option=self.module.OPT_NON_STR_KEYS)
+        except TypeError:
+            return jsonutils.dumps(obj)
+
+
+CODEC_CLASSES = {
+    'orjson': ORJSONCodec,
+    'ujson': UJSONCodec,
+    'simplejson': SimpleJSONCodec,
+    'json': JSONCodec,
+}
+
+_codecs = {}
+_default = None
+
+
+def get_codec(name=None):
+    """Return the codec for backend ``name``, or the default codec.
+
+    :raises ValueError: if the backend is unknown or not installed.
+    """
+    if name is None:
+        return _default
+    if name not in _codecs:
+        if name not in CODEC_CLASSES:
+            raise ValueError('JSON backend must be one of the following: %s.'
+                             % ', '.join(BACKENDS))
+        module = importutils.try_import(name)
+        if module is None:
+            raise ValueError('JSON backend %s is not installed.' % name)
+        _codecs[name] = CODEC_CLASSES[name](module)
+    return _codecs[name]
+
+
+def available_backends():
+    """Return the names of the installed backends, fastest first."""
+    return [name for name in BACKENDS
+            if importutils.try_import(name) is not None]
+
+
+def set_default_backend(name=None):
+    """Select the codec used by :func:`dumps` and :func:`loads`.
+
+    With no ``name`` the fastest installed backend is chosen.
+    """
+    global _default
+    if name is None:
+        name = available_backends()[0]
+    _default = get_codec(name)
+    return _default
+
+
+def dumps(obj):
+    return _default.dumps(obj)
+
+
+def loads(data):
+    return _default.loads(data)
+
+
+set_default_backend(os.environ.get('SGSCLIENT_JSON_BACKEND') or None)
@@ -0,0 +1,96 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Connection pools that survive fork().
+
+A child process must not use the sockets of connection pools created by
+its parent: both processes would read and write the same connections.
+Transports remember the PID they were created in and, once it changes,
+swap their requests sessions for fresh ones built here.
+"""
+
+import os
+import pickle
+import threading
+
+from oslo_log import log as logging
+import requests
+
+LOG = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_pid = os.getpid()
+# id() of a session inherited from the parent -> (that session, its
+# replacement). Inherited sessions are kept referenced so that their id()
+# cannot be reused by another session.
+_replacements = {}
+# PID -> lock serializing the _after_fork() calls in that process. A lock
+# inherited from the parent may have been held by one of its threads.
+_pid_locks = {}
+
+
+def session_for_process(session):
+    """Return the replacement of a session inherited from the parent.
+
+    The replacement has the same settings and empty connection pools. Every
+    caller in a process gets the same replacement, so clients that shared
+    a session before the fork still share one afterwards.
+    """
+    global _pid
+    pid = os.getpid()
+    with _lock:
+        if pid != _pid:
+            _pid = pid
+            # Sessions replaced in our parent are not ours either, but
+            # the replacements made there are inherited sessions now.
+            _replacements.clear()
+        entry = _replacements.get(id(session))
+        if entry is None or entry[0] is not session:
+            entry = _replacements[id(session)] = (session,
+                                                  _copy_session(session))
+            LOG.debug("Replaced connection pool inherited from the parent "
+                      "process in process %s", pid)
+        return entry[1]
+
+
+def _copy_session(session):
+    # Sessions and their adapters pickle their settings but not their
+    # connection pools, which are rebuilt empty when unpickled.
+    try:
+        return pickle.loads(pickle.dumps(session))
+    except Exception as e:
+        LOG.debug("Could not copy session settings: %s", e)
+        return requests.Session()
+
+
+class ProcessLocal(object):
+    """Mixin to notice that an object is used in a forked child.
+
+    :meth:`_check_pid` calls :meth:`_after_fork` once in each new process,
+    even when several threads of the child use the object at once.
+    """
+
+    _pid = None
+
+    def _check_pid(self):
+        pid = os.getpid()
+        if self._pid != pid:
+            # setdefault() is atomic: all the threads get the same lock.
+            with _pid_locks.setdefault(pid, threading.RLock()):
+                if self._pid != pid:
+                    if self._pid is not None:
+                        self._after_fork()
+                    self._pid = pid
+
+    def _after_fork(self):
+        pass
@@ -13,24 +13,31 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import copy
 import hashlib
+import itertools
 import os
 import socket
+import threading
+import zlib
 
 import keystoneclient.adapter as keystone_adapter
 from oslo_log import log as logging
-from oslo_serialization import jsonutils
 from oslo_utils import encodeutils
 import requests
 import six
 from six.moves import urllib
 
+from sgsclient.common import auth
+from sgsclient.common import codec
+from sgsclient.common import forksafe
 from sgsclient.openstack.common.apiclient import exceptions as exc
 
 LOG = logging.getLogger(__name__)
+KS_SESSION_LOG = logging.getLogger('keystoneclient.session')
 USER_AGENT = 'python-sgsclient'
 CHUNKSIZE = 1024 * 64  # 64kB
+COMPRESSION_THRESHOLD = 1024 * 4  # 4kB
+ACCEPT_ENCODING = 'gzip, deflate'
 
 
 def get_system_ca_file():
@@ -51,7 +58,167 @@ def get_system_ca_file():
     LOG.warning("System ca file could not be found.")
 
 
-class HTTPClient(object):
+def compress_body(data, threshold=COMPRESSION_THRESHOLD):
+    """Gzip a request body if it is at least ``threshold`` bytes long.
+
+    :returns: tuple of the body to send and the number of bytes saved; the
+              original body and 0 are returned when compression is skipped
+              or does not make the body smaller.
+    """
+    if isinstance(data, six.text_type):
+        data = data.encode('utf-8')
+    if not isinstance(data, six.binary_type) or len(data) < threshold:
+        return data, 0
+    # wbits of 16 + MAX_WBITS makes zlib emit a gzip header and trailer.
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    compressed = compressor.compress(data) + compressor.flush()
+    saved = len(data) - len(compressed)
+    if saved <= 0:
+        return data, 0
+    return compressed, saved
+
+
+class CompressionStats(object):
+    """Counters of the bytes kept off the wire by body compression.
+
+    Response savings are computed from the Content-Length of a gzip or
+    deflate encoded response and the size of the decoded body. Counters
+    may be updated from several threads at once.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests_compressed = 0
+            self.request_bytes_saved = 0
+            self.responses_compressed = 0
+            self.response_bytes_saved = 0
+
+    def record_request(self, saved):
+        with self._lock:
+            self.requests_compressed += 1
+            self.request_bytes_saved += saved
+
+    def record_response(self, resp, body):
+        encoding = resp.headers.get('content-encoding', '').lower()
+        if encoding not in ('gzip', 'deflate') or not body:
+            return
+        try:
+            wire_size = int(resp.headers.get('content-length'))
+        except (TypeError, ValueError):
+            return
+        with self._lock:
+            self.responses_compressed += 1
+            self.response_bytes_saved += max(len(body) - wire_size, 0)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'requests_compressed': self.requests_compressed,
+                'request_bytes_saved': self.request_bytes_saved,
+                'responses_compressed': self.responses_compressed,
+                'response_bytes_saved': self.response_bytes_saved,
+            }
+
+
+def encode_body(data):
+    """Return the JSON encoding of a request body.
+
+    Bodies that are already bytes, bytearray or memoryview objects are
+    taken as pre-encoded JSON and sent unchanged.
+    """
+    if isinstance(data, six.binary_type):
+        return data
+    # requests would iterate over these as a stream of ints.
+    if isinstance(data, memoryview):
+        # bytes(memoryview) is its repr on Python 2.
+        return data.tobytes()
+    if isinstance(data, bytearray):
+        return bytes(data)
+    return codec.dumps(data)
+
+
+def iter_chunks(resp, chunk_size=CHUNKSIZE):
+    """Iterate over the body of a streamed response in CHUNKSIZE blocks.
+
+    The response is closed, releasing its connection, once the body has
+    been read or the iterator is closed.
+    """
+    try:
+        for chunk in resp.iter_content(chunk_size):
+            if chunk:
+                yield chunk
+    finally:
+        resp.close()
+
+
+def iter_file(fileobj, chunk_size=CHUNKSIZE):
+    """Read a file-like object in CHUNKSIZE blocks.
+
+    requests sends a generator body with chunked transfer encoding, so at
+    most one block of the file is held in memory.
+    """
+    while True:
+        chunk = fileobj.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+def _is_stream(data):
+    """Tell whether a request body is used up once it has been sent."""
+    # Files, and iterators such as the generators of iter_file().
+    return (hasattr(data, 'read') or hasattr(data, '__next__') or
+            hasattr(data, 'next'))
+
+
+def _truncate(content, limit):
+    if limit is None or len(content) <= limit:
+        return content
+    return content[:limit]
+
+
+class LogSampler(object):
+    """Decide whether a request should be logged.
+
+    Nothing is logged unless ``logger`` has DEBUG enabled; when it has,
+    only one request in ``rate`` is logged.
+    """
+
+    def __init__(self, rate=None):
+        self.rate = max(int(rate or 1), 1)
+        self._counter = itertools.count()
+
+    def __call__(self, logger=LOG):
+        if not logger.isEnabledFor(logging.DEBUG):
+            return False
+        if self.rate == 1:
+            return True
+        return next(self._counter) % self.rate == 0
+
+
+def _compress_request(kwargs, threshold, stats):
+    data, saved = compress_body(kwargs['data'], threshold)
+    if saved:
+        kwargs['data'] = data
+        kwargs['headers']['Content-Encoding'] = 'gzip'
+        stats.record_request(saved)
+
+
+class HTTPClient(forksafe.ProcessLocal):
+    """sgs HTTP client built on requests.
+
+    One client, and the managers built on it, may be shared by any number
+    of threads: per-request state is kept on the stack, the header template
+    is swapped in atomically and the connection pool is thread-safe. A
+    client inherited by a forked process opens new connections there.
+    """
+
+    # (key, defaults, overrides) built by _header_template()
+    _headers = None
 
     def __init__(self, endpoint, **kwargs):
         self.endpoint = endpoint
@@ -68,6 +235,22 @@ class HTTPClient(object):
         self.key_file = kwargs.get('key_file')
         self.timeout = kwargs.get('timeout')
 
+        self.compress_requests = kwargs.get('compress_requests', False)
+        self.compression_threshold = kwargs.get('compression_threshold',
+                                                COMPRESSION_THRESHOLD)
+        self.compression_stats = CompressionStats()
+
+        # requests within the same session can reuse TCP connections from
+        # pool; clients talking to the same endpoints may share one.
+        self._owns_http = kwargs.get('http') is None
+        self.http = kwargs.get('http') or requests.Session()
+        self._check_pid()
+
+        # Only one request in log_sample_rate is logged at DEBUG level and
+        # logged bodies are cut to log_body_max bytes.
+        self.log_sampler = LogSampler(kwargs.get('log_sample_rate'))
+        self.log_body_max = kwargs.get('log_body_max')
+
         self.ssl_connection_params = {
             'cacert': kwargs.get('cacert'),
             'cert_file': kwargs.get('cert_file'),
@@ -82,6 +265,25 @@ class HTTPClient(object):
             else:
                 self.verify_cert = kwargs.get('cacert', get_system_ca_file())
 
+        # With exchange_credentials the username and password are traded
+        # for a keystone token once, instead of being sent on every call.
+        # A token_provider may be shared between several clients.
+        self.token_provider = kwargs.get('token_provider')
+        if (self.token_provider is None and not self.auth_token and
+                kwargs.get('exchange_credentials')):
+            self.token_provider = auth.TokenProvider.from_credentials(
+                self.auth_url, self.username, self.password,
+                project_id=self.project_id,
+                project_name=kwargs.get('project_name'),
+                user_domain_id=kwargs.get('user_domain_id'),
+                project_domain_id=kwargs.get('project_domain_id'),
+                verify=(not kwargs.get('insecure') and
+                        (kwargs.get('cacert') or True)),
+                cert=(self.cert_file, self.key_file)
+                if self.cert_file and self.key_file else None,
+                timeout=(float(self.timeout)
+                         if self.timeout is not None else None))
+
     def _safe_header(self, name, value):
         if name in ['X-Auth-Token', 'X-Subject-Token']:
             # because in python3 byte string handling is ... ug
@@ -114,47 +316,66 @@ class HTTPClient(object):
             curl.append('-k')
 
         if 'data' in kwargs:
-            curl.append('-d \'%s\'' % kwargs['data'])
+            if not isinstance(kwargs['data'], (six.binary_type,
+                                               six.text_type)):
+                curl.append('--data-binary @- <streamed>')
+            elif kwargs['headers'].get('Content-Encoding') == 'gzip':
+                curl.append('--data-binary @- <gzip, %d bytes>'
+                            % len(kwargs['data']))
+            else:
+                data = _truncate(kwargs['data'], self.log_body_max)
+                curl.append('-d \'%s\''
+                            % encodeutils.safe_decode(data, errors='replace'))
 
         curl.append('%s%s' % (self.endpoint, url))
         LOG.debug(' '.join(curl))
 
     @staticmethod
-    def log_http_response(resp):
+    def log_http_response(resp, body_max=None, logger=LOG):
         status = (resp.raw.version / 10.0, resp.status_code, resp.reason)
         dump = ['\nHTTP/%.1f %s %s' % status]
         dump.extend(['%s: %s' % (k, v) for k, v in resp.headers.items()])
         dump.append('')
-        if resp.content:
-            content = resp.content
+        # Never read the body of a streamed response here, the caller
+        # consumes it chunk by chunk.
+        if resp._content_consumed and resp.content:
+            content = _truncate(resp.content, body_max)
             if isinstance(content, six.binary_type):
+                # A truncated body may end in the middle of a character.
+                errors = 'strict' if content is resp.content else 'replace'
                 try:
-                    content = encodeutils.safe_decode(resp.content)
+                    content = encodeutils.safe_decode(content, errors=errors)
                 except UnicodeDecodeError:
                     pass
                 else:
                     dump.extend([content, ''])
-        LOG.debug('\n'.join(dump))
+        logger.debug('\n'.join(dump))
 
     def _http_request(self, url, method, **kwargs):
         """Send an http request with the specified characteristics.
 
-        Wrapper around requests.request to handle tasks such
+        Wrapper around requests.Session.request to handle tasks such
         as setting headers and error handling.
         """
-        # Copy the kwargs so we can reuse the original in case of redirects
-        kwargs['headers'] = copy.deepcopy(kwargs.get('headers', {}))
-        kwargs['headers'].setdefault('User-Agent', USER_AGENT)
-        if self.auth_token:
-            kwargs['headers'].setdefault('X-Auth-Token', self.auth_token)
-        else:
-            kwargs['headers'].update(self.credentials_headers())
-        if self.auth_url:
-            kwargs['headers'].setdefault('X-Auth-Url', self.auth_url)
-        if self.region_name:
-            kwargs['headers'].setdefault('X-Region-Name', self.region_name)
-
-        self.log_curl_request(method, url, kwargs)
+        reauthenticate = kwargs.pop('reauthenticate', True)
+        self._check_pid()
+        # Kept on the stack: another thread may be fetching a new token.
+        token = self.auth_token
+        if self.token_provider is not None:
+            token = self.token_provider.get_token()
+
+        # Copy the headers so we can reuse the original in case of
+        # redirects; header values are strings, a shallow copy will do.
+        caller_headers = kwargs.get('headers') or {}
+        defaults, overrides = self._header_template(token)
+        headers = dict(defaults)
+        headers.update(caller_headers)
+        headers.update(overrides)
+        kwargs['headers'] = headers
+
+        log_request = self.log_sampler()
+        if log_request:
+            self.log_curl_request(method, url, kwargs)
 
         if self.cert_file and self.key_file:
             kwargs['cert'] = (self.cert_file, self.key_file)
@@ -179,7 +400,7 @@ class HTTPClient(object):
         allow_redirects = False
 
         try:
-            resp = requests.request(
+            resp = self.http.request(
                 method,
                 self.endpoint_url + url,
                 allow_redirects=allow_redirects,
@@ -196,11 +417,26 @@ class HTTPClient(object):
                        {'endpoint': endpoint, 'e': e})
             raise exc.ConnectionRefused(message)
 
-        self.log_http_response(resp)
+        if log_request:
+            self.log_http_response(resp, self.log_body_max)
+
+        if (resp.status_code == 401 and self.token_provider is not None and
+                reauthenticate):
+            # The token may have been revoked or expired early: fetch a
+            # new one and retry once, as the apiclient HTTPClient does.
+            self.token_provider.invalidate(kwargs['headers'].get(
+                'X-Auth-Token'))
+            # A streamed body was used up by this attempt; sending it again
+            # would send an empty body. Let the caller retry instead.
+            if not _is_stream(kwargs.get('data')):
+                kwargs['headers'] = caller_headers
+                return self._http_request(url, method, reauthenticate=False,
+                                          follow_redirects=follow_redirects,
+                                          **kwargs)
 
         if 'X-Auth-Key' not in kwargs['headers'] and \
                 (resp.status_code == 401 or
-                 (resp.status_code == 500 and "(HTTP 401)" in resp.content)):
+                 (resp.status_code == 500 and b"(HTTP 401)" in resp.content)):
             raise exc.AuthorizationFailure("Authentication failed. Please try"
                                            " again.\n%s"
                                            % resp.content)
@@ -228,6 +464,37 @@ class HTTPClient(object):
             message = "Prohibited endpoint redirect %s" % location
             raise exc.EndpointException(message)
 
+    def _header_template(self, token=None):
+        """Return the headers added to every request.
+
+        The result is a pair of dicts: headers the caller may override
+        and headers that replace the caller's. Both are built once and
+        rebuilt only when the token, credentials or region change, so
+        they must not be modified.
+
+        :param token: token to send, defaults to ``auth_token``
+        """
+        if token is None:
+            token = self.auth_token
+        key = (token, self.username, self.password,
+               self.auth_url, self.region_name)
+        template = self._headers
+        if template is None or template[0] != key:
+            defaults = {'User-Agent': USER_AGENT}
+            overrides = {}
+            if token:
+                defaults['X-Auth-Token'] = token
+            else:
+                overrides = self.credentials_headers()
+            if self.auth_url:
+                defaults['X-Auth-Url'] = self.auth_url
+            if self.region_name:
+                defaults['X-Region-Name'] = self.region_name
+            # Swapped in with a single assignment so that concurrent
+            # requests never see a half-built template.
+            template = self._headers = (key, defaults, overrides)
+        return template[1], template[2]
+
     def credentials_headers(self):
         creds = {}
         if self.username:
@@ -240,6 +507,7 @@ class HTTPClient(object):
                      **kwargs):
         kwargs.setdefault('headers', {})
         kwargs['headers'].setdefault('Content-Type', content_type)
+        kwargs['headers'].setdefault('Accept-Encoding', ACCEPT_ENCODING)
         # Don't set Accept because we aren't always dealing in JSON
 
         if 'body' in kwargs:
@@ -249,14 +517,18 @@ class HTTPClient(object):
             LOG.warning("Use of 'body' is deprecated; use 'data' instead")
             kwargs['data'] = kwargs.pop('body')
         if 'data' in kwargs:
-            kwargs['data'] = jsonutils.dumps(kwargs['data'])
+            kwargs['data'] = encode_body(kwargs['data'])
+            if self.compress_requests:
+                _compress_request(kwargs, self.compression_threshold,
+                                  self.compression_stats)
 
         resp = self._http_request(url, method, **kwargs)
         body = resp.content
+        self.compression_stats.record_response(resp, body)
 
         if body and 'application/json' in resp.headers['content-type']:
             try:
-                body = resp.json()
+                body = codec.loads(body)
             except ValueError:
                 LOG.error('Could not decode response body as JSON')
         else:
@@ -265,16 +537,36 @@ class HTTPClient(object):
         return resp, body
 
     def raw_request(self, method, url, **kwargs):
+        """Send a non-JSON request.
+
+        With ``stream=True`` the response body is not read; consume it
+        with :func:`iter_chunks`. A file-like ``data`` is sent in chunks
+        of CHUNKSIZE bytes and cannot be replayed on redirect.
+        """
         if 'body' in kwargs:
             if 'data' in kwargs:
                 raise ValueError("Can't provide both 'data' and "
                                  "'body' to a request")
             LOG.warning("Use of 'body' is deprecated; use 'data' instead")
             kwargs['data'] = kwargs.pop('body')
-        # Chunking happens automatically if 'body' is a
-        # file-like object
+        if hasattr(kwargs.get('data'), 'read'):
+            kwargs['data'] = iter_file(kwargs['data'])
         return self._http_request(url, method, **kwargs)
 
+    def get_compression_stats(self):
+        return self.compression_stats.to_dict()
+
+    def reset_compression_stats(self):
+        self.compression_stats.reset()
+
+    def _after_fork(self):
+        self.http = forksafe.session_for_process(self.http)
+
+    def close(self):
+        """Close pooled connections, unless the session is shared."""
+        if self._owns_http:
+            self.http.close()
+
     def client_request(self, method, url, **kwargs):
         resp, body = self.json_request(method, url, **kwargs)
         return resp
@@ -298,30 +590,142 @@ class HTTPClient(object):
         return self.client_request("PATCH", url, **kwargs)
 
 
-class SessionClient(keystone_adapter.Adapter):
+class SessionClient(keystone_adapter.Adapter, forksafe.ProcessLocal):
     """sgs specific keystoneclient Adapter.
 
+    Like :class:`HTTPClient` it may be shared by many threads, the first
+    authentication and re-authentication after a 401 are single-flight,
+    and it opens new connections when used in a forked process.
     """
 
+    def __init__(self, *args, **kwargs):
+        self.compress_requests = kwargs.pop('compress_requests', False)
+        self.compression_threshold = kwargs.pop('compression_threshold',
+                                                COMPRESSION_THRESHOLD)
+        self.compression_stats = CompressionStats()
+        # As for HTTPClient; keystoneclient formats the logs unless bodies
+        # must be cut, which it cannot do.
+        self.log_sampler = LogSampler(kwargs.pop('log_sample_rate', None))
+        self.log_body_max = kwargs.pop('log_body_max', None)
+        refresh_token = kwargs.pop('refresh_token', False)
+        refresh_margin = kwargs.pop('refresh_margin', auth.REFRESH_MARGIN)
+        super(SessionClient, self).__init__(*args, **kwargs)
+
+        self._reauth_lock = threading.Lock()
+        # A long-lived client can renew its token in the background so
+        # that requests never stall on, or race for, re-authentication.
+        self.token_refresher = None
+        if refresh_token and self._auth_plugin() is not None:
+            self.token_refresher = auth.TokenRefresher(
+                self._auth_plugin(), self.session, margin=refresh_margin,
+                lock=self._reauth_lock)
+            self.token_refresher.start()
+        self._check_pid()
+
+    def _after_fork(self):
+        self._reauth_lock = threading.Lock()
+        self.session.session = forksafe.session_for_process(
+            self.session.session)
+        # Threads are not inherited by the child; start a new refresher.
+        if self.token_refresher is not None:
+            self.token_refresher = auth.TokenRefresher(
+                self.token_refresher.auth, self.session,
+                margin=self.token_refresher.margin,
+                retry_interval=self.token_refresher.retry_interval,
+                lock=self._reauth_lock)
+            self.token_refresher.start()
+
+    def _auth_plugin(self):
+        return self.auth or self.session.auth
+
+    def close(self):
+        if self.token_refresher is not None:
+            self.token_refresher.stop()
+
+    def _current_token(self):
+        # keystoneclient plugins do not lock around authentication; when
+        # there is no token yet let one thread fetch it for all the others.
+        if getattr(self._auth_plugin(), 'auth_ref', None) is None:
+            with self._reauth_lock:
+                return self.get_token()
+        return self.get_token()
+
+    def _invalidate_token(self, token):
+        # Only the first request rejected with a given token invalidates
+        # it; the others find a new token already in place and reuse it.
+        with self._reauth_lock:
+            if self.get_token() == token:
+                self.invalidate()
+
     def request(self, url, method, **kwargs):
+        resp = self._request(url, method, **kwargs)
+        return resp, resp.text
+
+    def _request(self, url, method, **kwargs):
+        self._check_pid()
         raise_exc = kwargs.pop('raise_exc', True)
+        # Truncated bodies are logged here, on the logger keystoneclient
+        # would use, so that one logger decides of both.
+        logger = self.logger or KS_SESSION_LOG
+        log = kwargs.pop('log', None)
+        if log is None:
+            log = self.log_sampler(logger)
+        log_truncated = log and self.log_body_max is not None
+        if log_truncated:
+            self._log_request(method, url, kwargs, logger)
+        kwargs['log'] = log and not log_truncated
+        allow_reauth = (kwargs.pop('allow_reauth', True) and
+                        kwargs.get('authenticated', True) is not False and
+                        self._auth_plugin() is not None)
+        token = self._current_token() if allow_reauth else None
         resp = super(SessionClient, self).request(url,
                                                   method,
                                                   raise_exc=False,
+                                                  allow_reauth=False,
                                                   **kwargs)
+        if resp.status_code == 401 and allow_reauth:
+            self._invalidate_token(token)
+            if _is_stream(kwargs.get('data')):
+                # The body was used up by the first attempt.
+                raise exc.AuthorizationFailure(
+                    "Authentication failed while streaming the request "
+                    "body. Please try again.")
+            resp = super(SessionClient, self).request(url,
+                                                      method,
+                                                      raise_exc=False,
+                                                      allow_reauth=False,
+                                                      **kwargs)
+
+        if log_truncated:
+            HTTPClient.log_http_response(resp, self.log_body_max, logger)
 
         if raise_exc and resp.status_code >= 400:
-            LOG.trace("Error communicating with {url}: {exc}"
-                      .format(url=url,
-                              exc=exc.from_response(resp, method, url)))
-            raise exc.from_response(resp, method, url)
+            error = exc.from_response(resp, method, url)
+            LOG.trace("Error communicating with %(url)s: %(exc)s",
+                      {'url': url, 'exc': error})
+            raise error
 
-        return resp, resp.text
+        return resp
+
+    def _log_request(self, method, url, kwargs, logger):
+        request = ['REQ: %s %s' % (method, url)]
+        data = kwargs.get('data')
+        if data is None:
+            pass
+        elif not isinstance(data, (six.binary_type, six.text_type)):
+            request.append('<streamed>')
+        elif kwargs.get('headers', {}).get('Content-Encoding') == 'gzip':
+            request.append('<gzip, %d bytes>' % len(data))
+        else:
+            data = _truncate(data, self.log_body_max)
+            request.append(encodeutils.safe_decode(data, errors='replace'))
+        logger.debug(' '.join(request))
 
     def json_request(self, method, url, **kwargs):
         headers = kwargs.setdefault('headers', {})
         headers['Content-Type'] = kwargs.pop('content_type',
                                              'application/json')
+        headers.setdefault('Accept-Encoding', ACCEPT_ENCODING)
         if 'body' in kwargs:
             if 'data' in kwargs:
                 raise ValueError("Can't provide both 'data' and "
@@ -329,43 +733,47 @@ class SessionClient(keystone_adapter.Adapter):
             LOG.warning("Use of 'body' is deprecated; use 'data' instead")
             kwargs['data'] = kwargs.pop('body')
         if 'data' in kwargs:
-            kwargs['data'] = jsonutils.dumps(kwargs['data'])
+            kwargs['data'] = encode_body(kwargs['data'])
             # NOTE(starodubcevna): We need to prove that json field is empty,
             # or it will be modified by keystone adapter.
             kwargs['json'] = None
+            if self.compress_requests:
+                _compress_request(kwargs, self.compression_threshold,
+                                  self.compression_stats)
 
-        resp, body = self.request(url, method, **kwargs)
+        resp = self._request(url, method, **kwargs)
+        # Decode straight from the raw bytes rather than resp.text, which
+        # would first build a full text copy of the body.
+        body = resp.content
+        self.compression_stats.record_response(resp, body)
         if body:
             try:
-                body = jsonutils.loads(body)
+                body = codec.loads(body)
             except ValueError:
-                pass
+                body = resp.text
         return resp, body
 
     def raw_request(self, method, url, **kwargs):
-        # A non-json request; instead of calling
-        # super.request, need to call the grandparent
-        # adapter.request
-        raise_exc = kwargs.pop('raise_exc', True)
+        # A non-json request; the body is sent and returned untouched.
         if 'body' in kwargs:
             if 'data' in kwargs:
                 raise ValueError("Can't provide both 'data' and "
                                  "'body' to a request")
             LOG.warning("Use of 'body' is deprecated; use 'data' instead")
             kwargs['data'] = kwargs.pop('body')
-        resp = keystone_adapter.Adapter.request(self,
-                                                url,
-                                                method,
-                                                raise_exc=False,
-                                                **kwargs)
-
-        if raise_exc and resp.status_code >= 400:
-            LOG.trace("Error communicating with {url}: {exc}"
-                      .format(url=url,
-                              exc=exc.from_response(resp, method, url)))
-            raise exc.from_response(resp, method, url)
-
-        return resp
+        if hasattr(kwargs.get('data'), 'read'):
+            kwargs['data'] = iter_file(kwargs['data'])
+        if kwargs.get('stream'):
+            # keystoneclient logs response.text, which would pull the whole
+            # streamed body into memory.
+            kwargs['log'] = False
+        return self._request(url, method, **kwargs)
+
+    def get_compression_stats(self):
+        return self.compression_stats.to_dict()
+
+    def reset_compression_stats(self):
+        self.compression_stats.reset()
 
 
 def _construct_http_client(*args, **kwargs):
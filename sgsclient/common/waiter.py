@@ -0,0 +1,194 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Wait for many resources to reach a status with one listing per round.
+"""
+
+import collections
+from concurrent import futures
+import threading
+import time
+
+from oslo_log import log as logging
+
+from sgsclient.openstack.common.apiclient import exceptions as exc
+
+LOG = logging.getLogger(__name__)
+
+# Seconds between two rounds while resources keep changing status.
+WAIT_INTERVAL = 2
+# Rounds without progress back off up to this many seconds.
+MAX_WAIT_INTERVAL = 30
+BACKOFF_FACTOR = 1.5
+WAIT_TIMEOUT = 600
+ERROR_STATES = ('error',)
+# Errors worth another round rather than failing every wait.
+TRANSIENT_ERRORS = (exc.ConnectionRefused, exc.RequestTimeout,
+                    exc.RequestEntityTooLarge, exc.HttpServerError)
+
+
+class ResourceInErrorState(exc.ClientException):
+    """A resource reached one of the error states."""
+
+    def __init__(self, resource):
+        super(ResourceInErrorState, self).__init__(
+            "%s is in status %s" % (resource.id, resource.status))
+        self.resource = resource
+
+
+class WaitTimeout(exc.ClientException):
+    """A resource did not reach a target state in time."""
+
+
+def _retry_after(headers):
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+class StatusWaiter(object):
+    """Poll a set of resources until each reaches a target state.
+
+    Every round lists the resources once, page by page, and resolves the
+    future of each resource that reached a target state, or fails it if
+    it reached an error state or disappeared. The interval between rounds
+    grows while nothing changes and follows the server's Retry-After.
+
+    :param manager: manager of the resources
+    :param resource_type: collection to list, e.g. ``'backups'``
+    :param ids: IDs of the resources to wait for
+    :param target_states: statuses to wait for; include ``'deleted'`` to
+                          wait for resources to disappear
+    :param search_opts: search options narrowing the listing, e.g. to a
+                        project or volume
+    """
+
+    def __init__(self, manager, resource_type, ids, target_states,
+                 timeout=WAIT_TIMEOUT, error_states=ERROR_STATES,
+                 search_opts=None, interval=WAIT_INTERVAL,
+                 max_interval=MAX_WAIT_INTERVAL, limit=None):
+        self.manager = manager
+        self.resource_type = resource_type
+        self.target_states = set(target_states)
+        self.error_states = set(error_states or ())
+        self.timeout = timeout
+        self.search_opts = search_opts
+        self.interval = interval
+        self.max_interval = max_interval
+        self.limit = limit
+        self.futures = collections.OrderedDict(
+            (rid, futures.Future()) for rid in ids)
+        self._thread = None
+
+    def start(self):
+        """Poll in a background thread and return the dict of futures."""
+        self._thread = threading.Thread(target=self.run,
+                                        name='sgsclient-wait-for-status')
+        self._thread.daemon = True
+        self._thread.start()
+        return self.futures
+
+    @staticmethod
+    def _resolve(future, result=None, exception=None):
+        # False if the caller cancelled the future meanwhile.
+        if future.set_running_or_notify_cancel():
+            if exception is not None:
+                future.set_exception(exception)
+            else:
+                future.set_result(result)
+
+    def _pending(self):
+        return dict((rid, future) for rid, future in self.futures.items()
+                    if not future.done())
+
+    def _list(self):
+        infos = []
+        marker = None
+        retry_after = None
+        while True:
+            url = self.manager._build_list_url(
+                self.resource_type, detailed=True,
+                search_opts=self.search_opts, marker=marker,
+                limit=self.limit)
+            resp, body = self.manager.api.json_request('GET', url)
+            retry_after = _retry_after(resp.headers) or retry_after
+            page = (body or {}).get(self.resource_type) or []
+            if not page:
+                return infos, retry_after
+            infos.extend(page)
+            marker = page[-1]['id']
+
+    def poll(self):
+        """Run one round.
+
+        :returns: the number of futures resolved and the Retry-After of
+                  the server, if any
+        """
+        pending = self._pending()
+        infos, retry_after = self._list()
+        found = set()
+        for info in infos:
+            future = pending.get(info['id'])
+            if future is None:
+                continue
+            found.add(info['id'])
+            resource = self.manager._make_resource(info, loaded=True)
+            if info.get('status') in self.target_states:
+                self._resolve(future, resource)
+            elif info.get('status') in self.error_states:
+                self._resolve(future,
+                              exception=ResourceInErrorState(resource))
+        for rid, future in pending.items():
+            if rid in found:
+                continue
+            if 'deleted' in self.target_states:
+                self._resolve(future)
+            else:
+                self._resolve(future, exception=exc.NotFound(
+                    "%s %s not found" % (self.resource_type, rid)))
+        resolved = len(pending) - len(self._pending())
+        return resolved, retry_after
+
+    def run(self):
+        deadline = time.time() + self.timeout
+        interval = self.interval
+        while True:
+            try:
+                resolved, retry_after = self.poll()
+            except TRANSIENT_ERRORS as e:
+                LOG.debug("Polling %s failed, retrying: %s",
+                          self.resource_type, e)
+                resolved = 0
+                response = getattr(e, 'response', None)
+                retry_after = (getattr(e, 'retry_after', None) or
+                               _retry_after(getattr(response, 'headers', {})))
+            except Exception as e:
+                for future in self._pending().values():
+                    self._resolve(future, exception=e)
+                return
+            if not self._pending():
+                return
+            if resolved:
+                interval = self.interval
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            time.sleep(min(retry_after or interval, remaining))
+            if not resolved:
+                interval = min(interval * BACKOFF_FACTOR, self.max_interval)
+        for rid, future in self._pending().items():
+            self._resolve(future, exception=WaitTimeout(
+                "%s %s did not reach %s within %s seconds" %
+                (self.resource_type, rid,
+                 ', '.join(sorted(self.target_states)), self.timeout)))
@@ -0,0 +1,209 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Poll a resource listing and report what was added, changed and deleted.
+"""
+
+import collections
+import hashlib
+import time
+
+from oslo_log import log as logging
+
+from sgsclient.common import codec
+
+LOG = logging.getLogger(__name__)
+
+ADDED = 'added'
+CHANGED = 'changed'
+DELETED = 'deleted'
+
+# Seconds between two polls.
+WATCH_INTERVAL = 10
+# Every that many polls the whole listing is fetched, even when the server
+# supports changes-since, to notice resources that were purged.
+FULL_POLL_EVERY = 30
+# Statuses of resources that are gone, as reported by changes-since.
+DELETED_STATUSES = ('deleted',)
+
+Event = collections.namedtuple('Event', ['type', 'resource'])
+
+
+def digest(info):
+    return hashlib.sha1(codec.dumps(info)).digest()
+
+
+class Changes(object):
+    """One listing of the resources changed since ``cursor``.
+
+    Iterating yields the pages of the listing, with the ``changes-since``
+    filter unless ``cursor`` is None. Meanwhile the IDs listed are
+    collected in ``seen`` and the newest ``updated_at``, or
+    ``created_at``, in ``newest``: the cursor of the next listing.
+
+    ``complete`` tells, once the pages are consumed, whether everything
+    was listed: without a cursor, or from a server that ignores the filter
+    and also returned resources older than the cursor. Resources not in
+    ``seen`` are then gone. Resources purged without a ``deleted`` status
+    are only noticed by such complete listings.
+
+    :param manager: manager of the resources
+    :param resource_type: collection to list, e.g. ``'volumes'``
+    :param cursor: ``updated_at`` to list the changes since, or None
+    :param limit: page size of the listing
+    """
+
+    def __init__(self, manager, resource_type, cursor=None, limit=None):
+        self.manager = manager
+        self.resource_type = resource_type
+        self.cursor = cursor
+        self.limit = limit
+        self.seen = set()
+        self.newest = cursor
+        self.complete = cursor is None
+
+    def __iter__(self):
+        search_opts = {'changes-since': self.cursor} if self.cursor else None
+        for page in self.manager._iter_pages(self.resource_type,
+                                             search_opts=search_opts,
+                                             limit=self.limit):
+            for info in page:
+                self.seen.add(info['id'])
+                updated_at = info.get('updated_at') or info.get('created_at')
+                if not updated_at:
+                    continue
+                if self.cursor and updated_at < self.cursor:
+                    if not self.complete:
+                        LOG.debug("changes-since is not supported for %s, "
+                                  "listing everything", self.resource_type)
+                    self.complete = True
+                if self.newest is None or updated_at > self.newest:
+                    self.newest = updated_at
+            yield page
+
+
+class Watcher(object):
+    """Report changes of the resources of one manager.
+
+    The first poll lists everything. Later polls ask the server for the
+    resources changed since the newest ``updated_at`` seen, when the
+    resources have one; a server that ignores the ``changes-since`` filter
+    is noticed and from then on each poll lists everything and compares
+    digests of the resources. Only a digest per resource is kept: the
+    resource of a DELETED event only has its ``id``.
+
+    :param manager: manager of the resources
+    :param resource_type: collection to list, e.g. ``'volumes'``
+    :param search_opts: search options to filter out resources
+    :param interval: seconds to sleep between polls
+    :param changes_since: use the ``changes-since`` filter; None to use
+                          it if the resources have ``updated_at``
+    :param initial: report the resources found by the first poll as ADDED
+    :param limit: page size of the listing
+    """
+
+    def __init__(self, manager, resource_type, search_opts=None,
+                 interval=WATCH_INTERVAL, changes_since=None, initial=False,
+                 limit=None, full_every=FULL_POLL_EVERY):
+        self.manager = manager
+        self.resource_type = resource_type
+        self.search_opts = dict(search_opts or {})
+        self.interval = interval
+        self.changes_since = changes_since
+        self.initial = initial
+        self.limit = limit
+        self.full_every = full_every
+        self._digests = None
+        self._cursor = None
+        self._polls = 0
+
+    def __iter__(self):
+        while True:
+            for event in self.poll():
+                yield event
+            time.sleep(self.interval)
+
+    def _fetch(self, cursor=None):
+        opts = dict(self.search_opts)
+        if cursor:
+            opts['changes-since'] = cursor
+        return self.manager._walk_pages(self.resource_type, True,
+                                        self.limit, opts, 'asc')
+
+    def _advance_cursor(self, infos):
+        for info in infos:
+            updated_at = info.get('updated_at')
+            if updated_at and (self._cursor is None or
+                               updated_at > self._cursor):
+                self._cursor = updated_at
+
+    def _resource(self, info):
+        return self.manager._make_resource(info, loaded=True)
+
+    def poll(self):
+        """Poll once and return the list of events."""
+        first = self._digests is None
+        self._polls += 1
+        full = (first or not self.changes_since or not self._cursor or
+                self._polls % self.full_every == 0)
+        cursor = None if full else self._cursor
+        infos = self._fetch(cursor)
+        if cursor and any(info.get('updated_at', cursor) < cursor
+                          for info in infos):
+            LOG.debug("changes-since is not supported for %s, comparing "
+                      "digests instead", self.resource_type)
+            self.changes_since = False
+            full = True
+        if first and self.changes_since is None:
+            self.changes_since = any('updated_at' in i for i in infos)
+        self._advance_cursor(infos)
+        if full:
+            events = self._diff_all(infos)
+        else:
+            events = self._diff_changes(infos)
+        return [] if first and not self.initial else events
+
+    def _diff_all(self, infos):
+        old = self._digests or {}
+        new = {}
+        events = []
+        for info in infos:
+            if info.get('status') in DELETED_STATUSES:
+                continue
+            new[info['id']] = value = digest(info)
+            previous = old.get(info['id'])
+            if previous is None:
+                events.append(Event(ADDED, self._resource(info)))
+            elif previous != value:
+                events.append(Event(CHANGED, self._resource(info)))
+        events.extend(Event(DELETED, self._resource({'id': rid}))
+                      for rid in old if rid not in new)
+        self._digests = new
+        return events
+
+    def _diff_changes(self, infos):
+        events = []
+        for info in infos:
+            rid = info['id']
+            if info.get('status') in DELETED_STATUSES:
+                if self._digests.pop(rid, None) is not None:
+                    events.append(Event(DELETED, self._resource({'id': rid})))
+                continue
+            value = digest(info)
+            previous = self._digests.get(rid)
+            self._digests[rid] = value
+            if previous is None:
+                events.append(Event(ADDED, self._resource(info)))
+            elif previous != value:
+                events.append(Event(CHANGED, self._resource(info)))
+        return events
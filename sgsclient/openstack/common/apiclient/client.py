@@ -28,14 +28,10 @@ OpenStack Client interface. Handles the REST calls and responses.
 import logging
 import time
 
-try:
-    import simplejson as json
-except ImportError:
-    import json
-
 import hashlib
 import requests
 
+from sgsclient.common import codec
 from sgsclient.openstack.common.apiclient import exceptions
 from oslo_utils import encodeutils
 from oslo_utils import importutils
@@ -144,7 +140,7 @@ class HTTPClient(object):
     def serialize(self, kwargs):
         if kwargs.get('json') is not None:
             kwargs['headers']['Content-Type'] = 'application/json'
-            kwargs['data'] = json.dumps(kwargs.pop('json'))
+            kwargs['data'] = codec.dumps(kwargs.pop('json'))
 
     def get_timings(self):
         return self.times
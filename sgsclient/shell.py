@@ -21,6 +21,7 @@ import sys
 
 from keystoneclient.auth.identity.generic import password
 from keystoneclient.auth.identity.generic import token
+from keystoneclient.auth.identity import v2 as identity_v2
 from keystoneclient.auth.identity import v3 as identity
 from keystoneclient import discover
 from keystoneclient import exceptions as ks_exc
@@ -35,13 +36,23 @@ import six.moves.urllib.parse as urlparse
 
 import sgsclient
 from sgsclient import client as sgs_client
+from sgsclient.common import cache
 from sgsclient.common import utils
 from sgsclient.openstack.common.apiclient import exceptions as exc
 
 logger = logging.getLogger(__name__)
 
+# Seconds for which the API versions offered by a keystone, and the
+# endpoints found in its service catalog, are remembered.
+DISCOVERY_CACHE_TTL = 24 * 60 * 60
+DEFAULT_SERVICE_TYPE = 'sg-service'
+DEFAULT_ENDPOINT_TYPE = 'publicURL'
+
 
 class SGServiceShell(object):
+
+    _cached_auth_ref = None
+
     def _append_global_identity_args(self, parser):
         # Register the CLI arguments that have moved to the session object.
         ksession.Session.register_cli_options(parser)
@@ -118,6 +129,19 @@ class SGServiceShell(object):
                             help="Do not contact keystone for a token. "
                                  "Defaults to env[OS_NO_CLIENT_AUTH].")
 
+        parser.add_argument('--os-identity-api-version',
+                            default=utils.env('OS_IDENTITY_API_VERSION'),
+                            help="Keystone API version to use, 2.0 or 3; "
+                                 "skips version discovery. Defaults to "
+                                 "env[OS_IDENTITY_API_VERSION].")
+
+        parser.add_argument('--os-no-cache',
+                            default=bool(utils.env('OS_NO_CACHE')),
+                            action='store_true',
+                            help="Do not reuse keystone tokens and service "
+                                 "catalogs cached by previous sgs commands. "
+                                 "Defaults to env[OS_NO_CACHE].")
+
         parser.add_argument('--sgs-url',
                             default=utils.env('SGS_URL'),
                             help='Defaults to env[SGS_URL].')
@@ -127,12 +151,16 @@ class SGServiceShell(object):
                             help='Defaults to env[SGS_API_VERSION] or 1.')
 
         parser.add_argument('--os-service-type',
-                            default=utils.env('OS_SERVICE_TYPE'),
-                            help='Defaults to env[OS_SERVICE_TYPE].')
+                            default=utils.env('OS_SERVICE_TYPE',
+                                              default=DEFAULT_SERVICE_TYPE),
+                            help='Defaults to env[OS_SERVICE_TYPE] or %s.'
+                                 % DEFAULT_SERVICE_TYPE)
 
         parser.add_argument('--os-endpoint-type',
-                            default=utils.env('OS_ENDPOINT_TYPE'),
-                            help='Defaults to env[OS_ENDPOINT_TYPE].')
+                            default=utils.env('OS_ENDPOINT_TYPE',
+                                              default=DEFAULT_ENDPOINT_TYPE),
+                            help='Defaults to env[OS_ENDPOINT_TYPE] or %s.'
+                                 % DEFAULT_ENDPOINT_TYPE)
 
         parser.add_argument('--include-password',
                             default=bool(utils.env(
@@ -188,7 +216,24 @@ class SGServiceShell(object):
                 subparser.add_argument(*args, **kwargs)
             subparser.set_defaults(func=callback)
 
-    def _discover_auth_versions(self, session, auth_url):
+    def _discover_auth_versions(self, session, auth_url,
+                                identity_api_version=None,
+                                discovery_cache=None):
+        # A pinned version needs no discovery at all.
+        if identity_api_version:
+            if identity_api_version.startswith('3'):
+                return (None, self._versioned_auth_url(auth_url, 'v3'))
+            if identity_api_version.startswith('2'):
+                return (self._versioned_auth_url(auth_url, 'v2.0'), None)
+            raise exc.CommandError("Unsupported identity API version %s, "
+                                   "must be 2.0 or 3." % identity_api_version)
+
+        if discovery_cache is not None:
+            versions = discovery_cache.get(auth_url,
+                                           max_age=DISCOVERY_CACHE_TTL)
+            if versions:
+                return tuple(versions)
+
         # discover the API versions the server is supporting base on the
         # given URL
         v2_auth_url = None
@@ -215,11 +260,83 @@ class SGServiceShell(object):
                        'version discovery. Please provide a versioned '
                        'auth_url instead. error=%s') % (e)
                 raise exc.CommandError(msg)
+        else:
+            if discovery_cache is not None:
+                discovery_cache.set(auth_url, [v2_auth_url, v3_auth_url])
 
         return (v2_auth_url, v3_auth_url)
 
+    @staticmethod
+    def _versioned_auth_url(auth_url, version):
+        url_parts = urlparse.urlparse(auth_url)
+        if url_parts.path.lower().startswith(('/v2', '/v3')):
+            return auth_url
+        return '%s/%s' % (auth_url.rstrip('/'), version)
+
+    def _get_caches(self, args):
+        """Return the token, discovery and endpoint caches.
+
+        All three are None when caching is disabled.
+        """
+        if args.os_no_cache:
+            return None, None, None
+        return (cache.TokenCache(), cache.FileCache('discovery'),
+                cache.FileCache('endpoints'))
+
+    @staticmethod
+    def _token_cache_key(auth_url, **kwargs):
+        project = (kwargs.get('project_id') or
+                   (kwargs.get('project_name'),
+                    kwargs.get('project_domain_id') or
+                    kwargs.get('project_domain_name')))
+        user = (kwargs.get('user_id') or
+                (kwargs.get('username'),
+                 kwargs.get('user_domain_id') or
+                 kwargs.get('user_domain_name')))
+        return auth_url, str(project), str(user)
+
+    def _get_cached_keystone_auth(self, token_cache, auth_url, **kwargs):
+        auth_ref = token_cache.load(*self._token_cache_key(auth_url,
+                                                           **kwargs))
+        if auth_ref is None:
+            return None
+        # The generic plugin copes with both v2 and v3 tokens, and with a
+        # valid auth_ref it needs neither version discovery nor a token
+        # request before handing out the token and service catalog.
+        auth = password.Password(auth_url,
+                                 username=kwargs.get('username'),
+                                 user_id=kwargs.get('user_id'),
+                                 password=kwargs.get('password'),
+                                 user_domain_id=kwargs.get('user_domain_id'),
+                                 user_domain_name=kwargs.get(
+                                     'user_domain_name'),
+                                 project_id=kwargs.get('project_id'),
+                                 project_name=kwargs.get('project_name'),
+                                 project_domain_id=kwargs.get(
+                                     'project_domain_id'),
+                                 project_domain_name=kwargs.get(
+                                     'project_domain_name'))
+        auth.auth_ref = self._cached_auth_ref = auth_ref
+        return auth
+
+    def _save_keystone_auth(self, token_cache, auth, auth_url, **kwargs):
+        auth_ref = getattr(auth, 'auth_ref', None)
+        # Nothing to write if the cached token was used as is.
+        if auth_ref is not None and auth_ref is not self._cached_auth_ref:
+            token_cache.save(*(self._token_cache_key(auth_url, **kwargs) +
+                               (auth_ref,)))
+
     def _get_keystone_auth(self, session, auth_url, **kwargs):
         auth_token = kwargs.pop('auth_token', None)
+        token_cache = kwargs.pop('token_cache', None)
+        discovery_cache = kwargs.pop('discovery_cache', None)
+        identity_api_version = kwargs.pop('identity_api_version', None)
+        if token_cache is not None and not auth_token:
+            auth = self._get_cached_keystone_auth(token_cache, auth_url,
+                                                  **kwargs)
+            if auth is not None:
+                return auth
+
         if auth_token:
             return token.Token(
                 auth_url,
@@ -237,12 +354,16 @@ class SGServiceShell(object):
 
         (v2_auth_url, v3_auth_url) = self._discover_auth_versions(
             session=session,
-            auth_url=auth_url)
+            auth_url=auth_url,
+            identity_api_version=identity_api_version,
+            discovery_cache=discovery_cache)
 
+        # The versioned plugins authenticate against the URL they are
+        # given, unlike the generic one, which would discover it again.
         if v3_auth_url:
             # NOTE(starodubcevna): set user_domain_id and project_domain_id
             # to default as it done in other projects.
-            return password.Password(auth_url,
+            return identity.Password(v3_auth_url,
                                      username=kwargs.pop('username'),
                                      user_id=kwargs.pop('user_id'),
                                      password=kwargs.pop('password'),
@@ -255,21 +376,55 @@ class SGServiceShell(object):
                                      project_domain_id=kwargs.pop(
                                          'project_domain_id') or 'default')
         elif v2_auth_url:
-            return password.Password(auth_url,
-                                     username=kwargs.pop('username'),
-                                     user_id=kwargs.pop('user_id'),
-                                     password=kwargs.pop('password'),
-                                     project_id=kwargs.pop('project_id'),
-                                     project_name=kwargs.pop('project_name'))
+            return identity_v2.Password(v2_auth_url,
+                                        username=kwargs.pop('username'),
+                                        user_id=kwargs.pop('user_id'),
+                                        password=kwargs.pop('password'),
+                                        tenant_id=kwargs.pop('project_id'),
+                                        tenant_name=kwargs.pop(
+                                            'project_name'))
         else:
             # if we get here it means domain information is provided
             # (caller meant to use Keystone V3) but the auth url is
             # actually Keystone V2. Obviously we can't authenticate a V3
             # user using V2.
-            exc.CommandError("Credential and auth_url mismatch. The given "
-                             "auth_url is using Keystone V2 endpoint, which "
-                             "may not able to handle Keystone V3 credentials. "
-                             "Please provide a correct Keystone V3 auth_url.")
+            raise exc.CommandError(
+                "Credential and auth_url mismatch. The given "
+                "auth_url is using Keystone V2 endpoint, which "
+                "may not able to handle Keystone V3 credentials. "
+                "Please provide a correct Keystone V3 auth_url.")
+
+    def _get_endpoint(self, session, auth, args, endpoint_cache=None,
+                      **kwargs):
+        """Find the SG-Service endpoint in the service catalog.
+
+        The endpoint is remembered per auth URL, project, service type,
+        endpoint type and region.
+        """
+        key = self._token_cache_key(args.os_auth_url, **kwargs) + (
+            args.os_service_type, args.os_endpoint_type, args.os_region_name)
+        if endpoint_cache is not None:
+            endpoint = endpoint_cache.get(key, max_age=DISCOVERY_CACHE_TTL)
+            if endpoint:
+                return endpoint
+
+        try:
+            endpoint = auth.get_endpoint(session,
+                                         service_type=args.os_service_type,
+                                         interface=args.os_endpoint_type,
+                                         region_name=args.os_region_name)
+        except ks_exc.ClientException as e:
+            raise exc.CommandError("Unable to find the SG-Service endpoint "
+                                   "in the service catalog: %s" % e)
+        if not endpoint:
+            raise exc.CommandError("No %s endpoint of service type %s found "
+                                   "in the service catalog. Use --sgs-url to "
+                                   "set it explicitly."
+                                   % (args.os_endpoint_type,
+                                      args.os_service_type))
+        if endpoint_cache is not None:
+            endpoint_cache.set(key, endpoint)
+        return endpoint
 
     def _setup_logging(self, debug):
         # Output the logs to command-line interface
@@ -345,14 +500,62 @@ class SGServiceShell(object):
                                        " either --os-auth-url or via"
                                        " env[OS_AUTH_URL]")
 
-        # TODO(luobin): use keystone get endpoint and kwargs
-        kwargs = {}
-        project_id = "468b0b3a8318403eba8e7d4fcf44e611"
-        endpoint = "http://162.3.117.200:8975/v1/%s" % project_id
-
+        endpoint = args.sgs_url
+        if args.os_no_client_auth:
+            kwargs = {
+                'token': args.os_auth_token,
+                'timeout': args.api_timeout,
+                'cacert': args.os_cacert,
+                'cert_file': args.os_cert,
+                'key_file': args.os_key,
+                'insecure': args.insecure,
+                'region_name': args.os_region_name,
+            }
+            client = sgs_client.Client(api_version, endpoint, **kwargs)
+            args.func(client, args)
+            return
+
+        token_cache, discovery_cache, endpoint_cache = self._get_caches(args)
+        auth_kwargs = {
+            'username': args.os_username,
+            'user_id': args.os_user_id,
+            'password': args.os_password,
+            'user_domain_id': args.os_user_domain_id,
+            'user_domain_name': args.os_user_domain_name,
+            'project_id': args.os_project_id or args.os_tenant_id,
+            'project_name': args.os_project_name or args.os_tenant_name,
+            'project_domain_id': args.os_project_domain_id,
+            'project_domain_name': args.os_project_domain_name,
+        }
+        keystone_session = ksession.Session.load_from_cli_options(args)
+        keystone_auth = self._get_keystone_auth(
+            keystone_session, args.os_auth_url,
+            auth_token=args.os_auth_token,
+            token_cache=token_cache,
+            discovery_cache=discovery_cache,
+            identity_api_version=args.os_identity_api_version,
+            **auth_kwargs)
+        if not endpoint:
+            endpoint = self._get_endpoint(keystone_session, keystone_auth,
+                                          args, endpoint_cache, **auth_kwargs)
+
+        # With a session the client is a SessionClient, which reuses the
+        # keystone session's connections and token.
+        kwargs = {
+            'session': keystone_session,
+            'auth': keystone_auth,
+            'service_type': args.os_service_type,
+            'endpoint_type': args.os_endpoint_type,
+            'region_name': args.os_region_name,
+        }
         client = sgs_client.Client(api_version, endpoint, **kwargs)
 
-        args.func(client, args)
+        try:
+            args.func(client, args)
+        finally:
+            if token_cache is not None and not args.os_auth_token:
+                self._save_keystone_auth(token_cache, keystone_auth,
+                                         args.os_auth_url, **auth_kwargs)
 
     def do_bash_completion(self, args):
         """Prints all of the commands and options to stdout."""
@@ -11,7 +11,18 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import collections
+import gzip
+import io
+import threading
+
+import fixtures
 from oslo_serialization import jsonutils
+from six.moves import BaseHTTPServer
+from six.moves import socketserver
+from six.moves.urllib import parse
+
+from sgsclient.common import codec
 
 
 class FakeHTTPResponse(object):
@@ -133,3 +144,159 @@ class FakeClient(object):
 
     def authenticate(self):
         pass
+
+
+VOLUMES = dict(('vol-%d' % i, {'id': 'vol-%d' % i, 'name': 'volume%d' % i,
+                               'status': 'enabled', 'size': i})
+               for i in range(10))
+
+
+def replication(i, updated_at='2016-11-01T08:00:00', status='enabled'):
+    """Return replication rep-<i> from volume vol-<i> to vol-<i + 5>."""
+    return {'id': 'rep-%d' % i, 'name': 'rep%d' % i, 'status': status,
+            'master_volume': 'vol-%d' % i, 'slave_volume': 'vol-%d' % (i + 5),
+            'updated_at': updated_at}
+
+
+class FakeSGSHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body=None):
+        data = codec.dumps(body) if body is not None else b''
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _handle(self, method):
+        server = self.server
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else None
+        if body and self.headers.get('Content-Encoding') == 'gzip':
+            body = gzip.GzipFile(fileobj=io.BytesIO(body)).read()
+        body = codec.loads(body) if body else None
+        with server.lock:
+            server.requests[(method, self.path)] += 1
+            server.bodies.append((method, self.path, body))
+        token = self.headers.get('X-Auth-Token')
+        if token not in server.valid_tokens:
+            return self._reply(401, {'error': 'Unauthorized'})
+        path, _sep, query = self.path.partition('?')
+        parts = path.split('/')[3:]
+        resources = server.resources.get(parts[0])
+        if resources is None:
+            return self._reply(404, {'error': 'Not Found'})
+        params = dict(parse.parse_qsl(query))
+        if not server.supports_changes_since:
+            params.pop('changes-since', None)
+        fields = params.pop('fields', None)
+        if fields and server.supports_fields:
+            fields = fields.split(',')
+        else:
+            fields = None
+
+        def project(r):
+            if not fields:
+                return r
+            return dict((k, r[k]) for k in fields if k in r)
+
+        if len(parts) == 1 or parts[1] == 'detail':
+            listed = self._list(resources, params)
+            if len(parts) == 1:
+                listed = [{'id': r['id'], 'name': r.get('name')}
+                          for r in listed]
+            return self._reply(200, {parts[0]: [project(r) for r in listed]})
+        if parts[1] not in resources:
+            return self._reply(404, {'error': 'Not Found'})
+        if method == 'PUT' and len(parts) == 2:
+            with server.lock:
+                resources[parts[1]] = dict(resources[parts[1]],
+                                           **body[parts[0][:-1]])
+        return self._reply(200, {parts[0][:-1]: project(resources[parts[1]])})
+
+    @staticmethod
+    def _list(resources, params):
+        marker = params.pop('marker', None)
+        limit = int(params.pop('limit', 0)) or None
+        reverse = params.pop('sort', None) == 'id:desc'
+        since = params.pop('changes-since', '')
+        result = [r for key, r in sorted(resources.items(), reverse=reverse)
+                  if (marker is None or
+                      (key < marker if reverse else key > marker)) and
+                  r.get('updated_at', '') >= since and
+                  all(str(r.get(k)) == v for k, v in params.items())]
+        return result[:limit]
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_PUT(self):
+        self._handle('PUT')
+
+
+class FakeSGSServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    """Local sgs API serving the dicts in ``resources``.
+
+    Listings honour marker, limit, sort=id:desc, changes-since, fields and
+    equality filters, unless ``supports_fields`` or
+    ``supports_changes_since`` is turned off; PUT updates a resource.
+    Every request is counted in ``requests`` and its decoded body kept in
+    ``bodies``.
+    """
+    daemon_threads = True
+
+    def __init__(self):
+        BaseHTTPServer.HTTPServer.__init__(self, ('127.0.0.1', 0),
+                                           FakeSGSHandler)
+        self.lock = threading.Lock()
+        self.requests = collections.Counter()
+        self.bodies = []
+        self.supports_fields = True
+        self.supports_changes_since = True
+        self.valid_tokens = set(['token'])
+        self.resources = {'volumes': dict(VOLUMES)}
+
+    @property
+    def endpoint(self):
+        return 'http://127.0.0.1:%d/v1/fake' % self.server_address[1]
+
+
+class FakeSGSServerFixture(fixtures.Fixture):
+    """Run a :class:`FakeSGSServer` in a thread for the test's duration.
+
+    :param resources: dict of resource type to the resources it lists,
+                      keyed by ID; defaults to ten volumes
+    """
+
+    def __init__(self, resources=None):
+        super(FakeSGSServerFixture, self).__init__()
+        self.resources = resources
+
+    def _setUp(self):
+        self.server = FakeSGSServer()
+        if self.resources is not None:
+            self.server.resources = self.resources
+        thread = threading.Thread(target=self.server.serve_forever,
+                                  args=(0.05,))
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+
+class FakeReplicationsFixture(FakeSGSServerFixture):
+    """:class:`FakeSGSServerFixture` serving five replications of the volumes.
+
+    ``replications`` is the dict of them the server lists, rep-0 to rep-4,
+    for tests to change.
+    """
+
+    def _setUp(self):
+        super(FakeReplicationsFixture, self)._setUp()
+        self.replications = dict(('rep-%d' % i, replication(i))
+                                 for i in range(5))
+        self.server.resources['replications'] = self.replications
@@ -0,0 +1,123 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import io
+import threading
+import time
+
+import mock
+
+from sgsclient.common import auth
+from sgsclient.common import http
+from sgsclient.openstack.common.apiclient import exceptions as exc
+from sgsclient.tests.unit import base
+from sgsclient.tests.unit import test_cache
+from sgsclient.tests.unit import test_http
+
+
+class TokenRefresherTest(base.TestCaseShell):
+
+    def test_refreshes_ahead_of_expiry(self):
+        refreshed = threading.Event()
+        plugin = mock.Mock(auth_ref=test_cache.v3_access(2))
+        plugin.get_access.side_effect = lambda session: plugin.auth_ref
+
+        def get_auth_ref(session):
+            refreshed.set()
+            return test_cache.v3_access(3600)
+
+        plugin.get_auth_ref.side_effect = get_auth_ref
+        refresher = auth.TokenRefresher(plugin, mock.Mock(), margin=120,
+                                        retry_interval=0.1)
+        refresher.start()
+        self.addCleanup(refresher.stop)
+        self.assertTrue(refreshed.wait(5))
+        refresher.stop()
+        self.assertFalse(plugin.invalidate.called)
+        self.assertGreater(auth.seconds_until_expiry(plugin.auth_ref), 3000)
+
+    def test_short_lived_tokens_are_not_refreshed_in_a_loop(self):
+        plugin = mock.Mock(auth_ref=test_cache.v3_access(200))
+        plugin.get_access.side_effect = lambda session: plugin.auth_ref
+        plugin.get_auth_ref.side_effect = (
+            lambda session: test_cache.v3_access(200))
+        refresher = auth.TokenRefresher(plugin, mock.Mock(), margin=300)
+        # Halfway through the lifetime rather than right away.
+        self.assertTrue(95 < refresher._next_refresh() <= 100)
+        plugin.auth_ref = test_cache.v3_access(-60)
+        self.assertEqual(refresher.retry_interval, refresher._next_refresh())
+
+        refresher = auth.TokenRefresher(plugin, mock.Mock(), margin=300,
+                                        retry_interval=0.1)
+        plugin.auth_ref = test_cache.v3_access(0)
+        refresher.start()
+        self.addCleanup(refresher.stop)
+        time.sleep(0.5)
+        refresher.stop()
+        self.assertLessEqual(plugin.get_auth_ref.call_count, 5)
+
+
+class SessionClientReauthTest(base.TestCaseShell):
+
+    def setUp(self):
+        super(SessionClientReauthTest, self).setUp()
+        self.session = mock.Mock()
+        self.session.get_token.return_value = 'token1'
+        self.client = http.SessionClient(session=self.session,
+                                         auth=mock.Mock())
+
+    def test_401_retried_once_with_new_token(self):
+        self.session.request.side_effect = [
+            test_http.fake_response(status_code=401),
+            test_http.fake_response(status_code=204)]
+        resp = self.client.raw_request('DELETE', '/volumes/1')
+        self.assertEqual(204, resp.status_code)
+        self.assertEqual(1, self.session.invalidate.call_count)
+        for call in self.session.request.call_args_list:
+            self.assertFalse(call[1]['allow_reauth'])
+
+    def test_streamed_body_is_not_resent_after_401(self):
+        self.session.request.return_value = test_http.fake_response(
+            status_code=401)
+        self.assertRaises(exc.AuthorizationFailure, self.client.raw_request,
+                          'PUT', '/backups/1', data=io.BytesIO(b"data"))
+        self.assertEqual(1, self.session.request.call_count)
+        self.assertEqual(1, self.session.invalidate.call_count)
+
+    def test_refresher_and_first_request_authenticate_once(self):
+        authenticated = []
+
+        class Plugin(object):
+            auth_ref = None
+
+            def get_access(self, session):
+                if self.auth_ref is None:
+                    time.sleep(0.1)
+                    authenticated.append(None)
+                    self.auth_ref = test_cache.v3_access(3600)
+                return self.auth_ref
+
+        plugin = Plugin()
+        self.session.get_token.side_effect = (
+            lambda auth=None: plugin.get_access(self.session).auth_token)
+        self.session.request.return_value = test_http.fake_response(
+            status_code=204)
+        client = http.SessionClient(session=self.session, auth=plugin,
+                                    refresh_token=True)
+        self.addCleanup(client.close)
+        client.raw_request('DELETE', '/volumes/1')
+        self.assertEqual(1, len(authenticated))
+
+    def test_stale_401_does_not_invalidate_new_token(self):
+        # Another request already replaced token0.
+        self.client._invalidate_token('token0')
+        self.assertFalse(self.session.invalidate.called)
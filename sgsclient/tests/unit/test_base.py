@@ -0,0 +1,281 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import gc
+
+import mock
+
+from sgsclient.common import base as sgs_base
+from sgsclient.common import codec
+from sgsclient.tests.unit import base
+from sgsclient.tests.unit import fakes as unit_fakes
+from sgsclient.tests.unit import test_concurrency
+from sgsclient.tests.unit.v1 import fakes
+from sgsclient.v1 import client
+
+cs = fakes.FakeClient()
+
+
+class ActionBodyTest(base.TestCaseShell):
+
+    def test_constant_body_encoded_once(self):
+        with mock.patch.object(codec, 'dumps',
+                               side_effect=codec.dumps) as mock_dumps:
+            first = cs.volumes._action_body('enable_cached_test')
+            second = cs.replicates._action_body('enable_cached_test')
+        self.assertIs(first, second)
+        self.assertEqual(1, mock_dumps.call_count)
+        self.assertEqual({'enable_cached_test': None}, codec.loads(first))
+
+    def test_unhashable_info_not_cached(self):
+        info = {'peer_volume': ['a', 'b']}
+        body = cs.volumes._action_body('create_replicate', info)
+        self.assertEqual({'create_replicate': info}, codec.loads(body))
+        self.assertNotIn(('create_replicate', tuple(info.items())),
+                         sgs_base._action_bodies)
+
+    def test_equal_values_of_other_types_not_shared(self):
+        bodies = [cs.volumes._action_body('force_cached_test',
+                                          {'force': value})
+                  for value in (True, 1, 1.0, True)]
+        # True == 1 == 1.0, but each is sent as given.
+        self.assertEqual([b'true', b'1', b'1.0', b'true'],
+                         [b.split(b':')[-1].strip(b' }') for b in bodies])
+        self.assertIs(bodies[0], bodies[3])
+
+    @mock.patch('sgsclient.common.http.HTTPClient.json_request')
+    def test_action_sends_pre_encoded_body(self, mock_request):
+        mock_request.return_value = ({}, {'volume': {'id': '1'}})
+        cs.volumes.attach('1', 'instance', '/dev/vdb')
+        data = mock_request.call_args[1]['data']
+        self.assertIsInstance(data, bytes)
+        self.assertEqual({'attach': {'instance_uuid': 'instance',
+                                     'mountpoint': '/dev/vdb',
+                                     'mode': 'rw',
+                                     'host_name': None}},
+                         codec.loads(data))
+
+
+class ListParallelTest(base.TestCaseShell):
+
+    def setUp(self):
+        super(ListParallelTest, self).setUp()
+        self.server = self.useFixture(unit_fakes.FakeSGSServerFixture()).server
+        self.server.resources = {'snapshots': dict(
+            ('snap-%02d' % i, {'id': 'snap-%02d' % i,
+                               'status': 'error' if i % 4 else 'available'})
+            for i in range(30))}
+        self.client = client.Client(self.server.endpoint, token='token')
+
+    def _pages(self):
+        return sum(count for (method, path), count
+                   in self.server.requests.items())
+
+    def test_bidirectional_walks_meet(self):
+        result = self.client.snapshots.list_parallel(limit=4)
+        self.assertEqual(['snap-%02d' % i for i in range(30)],
+                         [s.id for s in result])
+        # Sequential paging takes 8 pages plus an empty one; each end
+        # walks about half of them and may fetch one page past the other.
+        self.assertLessEqual(self._pages(), 10)
+
+    def test_partitions(self):
+        result = self.client.snapshots.list_parallel(
+            detailed=True, limit=5, partitions=[
+                {'status': 'available'}, {'status': 'error'}])
+        self.assertEqual(30, len(result))
+        self.assertEqual(['snap-%02d' % i for i in range(0, 30, 4)],
+                         [s.id for s in result[:8]])
+        self.assertTrue(all(s.status == 'error' for s in result[8:]))
+
+
+class IdentityMapTest(base.TestCaseShell):
+
+    def setUp(self):
+        super(IdentityMapTest, self).setUp()
+        self.client = client.Client('http://sgs.example.com/v1/fake',
+                                    token='token', identity_map=True)
+        patcher = mock.patch.object(self.client.http_client, 'json_request')
+        self.mock_request = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _respond(self, body):
+        self.mock_request.return_value = (mock.Mock(), body)
+
+    def test_one_instance_per_id(self):
+        self._respond({'volume': {'id': 'vol-1', 'status': 'enabled',
+                                  'size': 1}})
+        volume = self.client.volumes.get('vol-1')
+        self._respond({'volumes': [{'id': 'vol-1', 'status': 'disabled'},
+                                   {'id': 'vol-2', 'status': 'enabled'}]})
+        listed = self.client.volumes.list()
+        self.assertIs(volume, listed[0])
+        self.assertEqual('disabled', volume.status)
+        self.assertEqual(1, volume.size)
+        self.assertEqual({'id': 'vol-1', 'status': 'disabled', 'size': 1},
+                         volume.to_dict())
+
+        self._respond({'volume': {'id': 'vol-1', 'status': 'enabled'}})
+        self.assertIs(volume, self.client.replicates.enable('vol-1'))
+        self.assertEqual('enabled', volume.status)
+        # The VolumeManager is kept, ReplicateManager cannot lazy-load.
+        self.assertIs(self.client.volumes, volume.manager)
+
+    def test_resources_weakly_referenced(self):
+        self._respond({'volume': {'id': 'vol-1'}})
+        self.client.volumes.get('vol-1')
+        gc.collect()
+        self.assertEqual(0, len(self.client.identity_map))
+
+    def test_disabled_by_default(self):
+        cs = client.Client('http://sgs.example.com/v1/fake', token='token')
+        self.assertIsNone(cs.identity_map)
+        with mock.patch.object(cs.http_client, 'json_request',
+                               return_value=(None, {'volume': {'id': '1'}})):
+            self.assertIsNot(cs.volumes.get('1'), cs.volumes.get('1'))
+
+
+class LazyLoadTest(base.TestCaseShell):
+
+    def setUp(self):
+        super(LazyLoadTest, self).setUp()
+        self.server = self.useFixture(unit_fakes.FakeSGSServerFixture()).server
+
+    def _sizes(self, lazy_load):
+        cs = client.Client(self.server.endpoint, token='token',
+                           lazy_load=lazy_load)
+        self.server.requests.clear()
+        return [v.size for v in cs.volumes.list(limit=4)]
+
+    def test_batch(self):
+        self.assertEqual([0, 1, 2, 3], self._sizes('batch'))
+        self.assertEqual({('GET', '/v1/fake/volumes?limit=4'): 1,
+                          ('GET', '/v1/fake/volumes/detail?limit=4'): 1},
+                         dict(self.server.requests))
+
+    def test_per_item(self):
+        self.assertEqual([0, 1, 2, 3], self._sizes('per-item'))
+        self.assertEqual(5, sum(self.server.requests.values()))
+
+    def test_never(self):
+        self.assertRaises(AttributeError, self._sizes, 'never')
+        self.assertRaises(ValueError, client.Client, self.server.endpoint,
+                          token='token', lazy_load='sometimes')
+
+    def test_batch_with_concurrent_readers(self):
+        cs = client.Client(self.server.endpoint, token='token',
+                           lazy_load='batch')
+        listed = cs.volumes.list()
+        self.server.requests.clear()
+        errors = test_concurrency.run_threads(
+            lambda: [v.size for v in reversed(listed)])
+        self.assertEqual([], errors)
+        self.assertEqual(1, sum(self.server.requests.values()))
+
+
+class SaveTest(base.TestCaseShell):
+
+    def setUp(self):
+        super(SaveTest, self).setUp()
+        self.server = self.useFixture(unit_fakes.FakeSGSServerFixture()).server
+        self.cs = client.Client(self.server.endpoint, token='token')
+
+    def _puts(self):
+        return [(path, body) for method, path, body in self.server.bodies
+                if method == 'PUT']
+
+    def test_save_sends_changes_only(self):
+        volume = self.cs.volumes.get('vol-1')
+        self.assertFalse(volume.save())
+        volume.name = 'renamed'
+        volume.description = 'new'
+        self.assertEqual({'name': 'renamed', 'description': 'new'},
+                         volume.changes())
+        self.assertTrue(volume.save())
+        self.assertEqual(
+            [('/v1/fake/volumes/vol-1',
+              {'volume': {'name': 'renamed', 'description': 'new'}})],
+            self._puts())
+        self.assertFalse(volume.is_dirty())
+        self.assertEqual('renamed', volume.to_dict()['name'])
+
+    def test_lazy_loaded_attributes_are_not_changes(self):
+        cs = client.Client(self.server.endpoint, token='token',
+                           lazy_load='per-item')
+        volume = cs.volumes.list(limit=1)[0]
+        volume.size
+        self.assertEqual({}, volume.changes())
+
+    def test_refresh_keeps_unsaved_changes(self):
+        cs = client.Client(self.server.endpoint, token='token',
+                           identity_map=True)
+        volume = cs.volumes.get('vol-1')
+        volume.name = 'renamed'
+        self.server.resources['volumes']['vol-1'] = dict(
+            self.server.resources['volumes']['vol-1'], status='disabled')
+        self.assertIs(volume, [v for v in cs.volumes.list(detailed=True)
+                               if v.id == 'vol-1'][0])
+        self.assertEqual('renamed', volume.name)
+        self.assertEqual('disabled', volume.status)
+        self.assertEqual({'name': 'renamed'}, volume.changes())
+        self.assertEqual('volume1', volume.to_dict()['name'])
+        self.assertTrue(volume.save())
+        self.assertFalse(volume.is_dirty())
+
+    def test_save_all(self):
+        volumes = self.cs.volumes.list(detailed=True, limit=6)
+        for volume in volumes[::2]:
+            volume.name = 'renamed-%s' % volume.id
+        saved = sgs_base.save_all(volumes, max_workers=3)
+        self.assertEqual(volumes[::2], saved)
+        self.assertEqual(sorted('/v1/fake/volumes/%s' % v.id
+                                for v in volumes[::2]),
+                         sorted(path for path, body in self._puts()))
+        self.assertEqual([], sgs_base.save_all(volumes))
+
+
+class FieldsTest(base.TestCaseShell):
+
+    def setUp(self):
+        super(FieldsTest, self).setUp()
+        self.server = self.useFixture(unit_fakes.FakeSGSServerFixture()).server
+        self.cs = client.Client(self.server.endpoint, token='token',
+                                lazy_load='per-item')
+
+    def _check(self):
+        volumes = self.cs.volumes.list(detailed=True, limit=2,
+                                       fields=['status'])
+        volume = self.cs.volumes.get('vol-1', fields=['size'])
+        self.assertEqual([{'id': 'vol-0', 'status': 'enabled'},
+                          {'id': 'vol-1', 'status': 'enabled'}],
+                         [v.to_dict() for v in volumes])
+        self.assertEqual({'id': 'vol-1', 'size': 1}, volume.to_dict())
+        # Left out on purpose: not lazy-loaded.
+        self.assertRaises(AttributeError, getattr, volume, 'name')
+        self.assertEqual(
+            {('GET', '/v1/fake/volumes/detail?fields=id%2Cstatus&limit=2'): 1,
+             ('GET', '/v1/fake/volumes/vol-1?fields=id%2Csize'): 1},
+            dict(self.server.requests))
+
+    def test_fields(self):
+        self._check()
+
+    def test_fields_ignored_by_server(self):
+        self.server.supports_fields = False
+        self._check()
+
+    def test_project(self):
+        info = {'id': '1', 'status': 'enabled', 'size': 1}
+        self.assertEqual({'id': '1', 'size': 1},
+                         sgs_base.project(info, ['size']))
+        self.assertIs(info, sgs_base.project(info, None))
+        self.assertIs(info, sgs_base.project(info, ['status', 'size']))
@@ -0,0 +1,92 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import datetime
+import os
+import stat
+
+import fixtures
+from keystoneclient import access
+
+from sgsclient.common import cache
+from sgsclient.tests.unit import base
+
+AUTH_URL = 'http://keystone.example.com:5000/v3'
+
+
+def v3_access(expires_in):
+    expires = datetime.datetime.utcnow() + datetime.timedelta(
+        seconds=expires_in)
+    body = {'token': {
+        'expires_at': expires.strftime('%Y-%m-%dT%H:%M:%S.000000Z'),
+        'issued_at': '2016-11-01T08:00:00.000000Z',
+        'methods': ['password'],
+        'user': {'id': 'u1', 'name': 'user',
+                 'domain': {'id': 'default', 'name': 'Default'}},
+        'project': {'id': 'p1', 'name': 'project',
+                    'domain': {'id': 'default', 'name': 'Default'}},
+        'catalog': [{'type': 'sg-service', 'id': 's1', 'endpoints': [
+            {'interface': 'public', 'region': 'RegionOne',
+             'url': 'http://sgs.example.com:8975/v1/p1'}]}],
+    }}
+    return access.AccessInfo.factory(body=body, auth_token='token-1')
+
+
+class FileCacheTest(base.TestCaseShell):
+
+    def setUp(self):
+        super(FileCacheTest, self).setUp()
+        self.cache_dir = self.useFixture(fixtures.TempDir()).path
+
+    def test_entries_are_private(self):
+        file_cache = cache.FileCache('test', self.cache_dir)
+        file_cache.set('key', {'a': 1})
+        self.assertEqual({'a': 1}, file_cache.get('key'))
+        self.assertEqual(
+            0o700, stat.S_IMODE(os.stat(file_cache.path).st_mode))
+        for name in os.listdir(file_cache.path):
+            mode = os.stat(os.path.join(file_cache.path, name)).st_mode
+            self.assertEqual(0o600, stat.S_IMODE(mode))
+
+    def test_world_readable_entry_ignored(self):
+        file_cache = cache.FileCache('test', self.cache_dir)
+        file_cache.set('key', 'value')
+        os.chmod(file_cache._entry_path('key'), 0o644)
+        self.assertIsNone(file_cache.get('key'))
+
+    def test_max_age(self):
+        file_cache = cache.FileCache('test', self.cache_dir)
+        file_cache.set('key', 'value')
+        self.assertEqual('value', file_cache.get('key', max_age=60))
+        self.assertIsNone(file_cache.get('key', max_age=-1))
+
+
+class TokenCacheTest(base.TestCaseShell):
+
+    def setUp(self):
+        super(TokenCacheTest, self).setUp()
+        self.token_cache = cache.TokenCache(
+            self.useFixture(fixtures.TempDir()).path)
+
+    def test_round_trip(self):
+        self.token_cache.save(AUTH_URL, 'p1', 'u1', v3_access(3600))
+        auth_ref = self.token_cache.load(AUTH_URL, 'p1', 'u1')
+        self.assertEqual('token-1', auth_ref.auth_token)
+        self.assertEqual(
+            'http://sgs.example.com:8975/v1/p1',
+            auth_ref.service_catalog.url_for(service_type='sg-service',
+                                             endpoint_type='public'))
+        self.assertIsNone(self.token_cache.load(AUTH_URL, 'p2', 'u1'))
+
+    def test_token_close_to_expiry_not_reused(self):
+        self.token_cache.save(AUTH_URL, 'p1', 'u1', v3_access(60))
+        self.assertIsNone(self.token_cache.load(AUTH_URL, 'p1', 'u1'))
@@ -0,0 +1,66 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import gc
+
+import mock
+
+from sgsclient import client
+from sgsclient.tests.unit import base
+from sgsclient.v1 import client as v1_client
+
+ENDPOINT = 'http://sgs.example.com:8975/v1/%s'
+
+
+class ClientPoolTest(base.TestCaseShell):
+
+    def test_client_class_imported_once(self):
+        client.get_client_class('1')
+        with mock.patch('oslo_utils.importutils.import_versioned_module',
+                        side_effect=AssertionError) as mock_import:
+            self.assertIs(v1_client.Client, client.get_client_class(1))
+        self.assertFalse(mock_import.called)
+
+    def test_clients_reused_and_share_connections(self):
+        pool = client.ClientPool(token='token')
+        one = pool.get(ENDPOINT % 'p1', project_id='p1',
+                       region_name='RegionOne')
+        self.assertIs(one, pool.get(ENDPOINT % 'p1', project_id='p1',
+                                    region_name='RegionOne'))
+        two = pool.get(ENDPOINT % 'p2', project_id='p2',
+                       region_name='RegionOne')
+        self.assertIsNot(one, two)
+        self.assertEqual('p2', two.http_client.project_id)
+        self.assertEqual('RegionOne', two.http_client.region_name)
+        self.assertIs(one.http_client.http, two.http_client.http)
+
+    def test_lru_eviction(self):
+        pool = client.ClientPool(max_size=2, token='token')
+        first = pool.get(ENDPOINT % 'p1', project_id='p1')
+        pool.get(ENDPOINT % 'p2', project_id='p2')
+        pool.get(ENDPOINT % 'p1', project_id='p1')
+        pool.get(ENDPOINT % 'p3', project_id='p3')
+        self.assertEqual(2, len(pool))
+        self.assertIs(first, pool.get(ENDPOINT % 'p1', project_id='p1'))
+        self.assertNotIn(('p2', None, ENDPOINT % 'p2'), pool._clients)
+
+    def test_evicted_client_is_not_closed_while_referenced(self):
+        pool = client.ClientPool(max_size=1, token='token')
+        first = pool.get(ENDPOINT % 'p1', project_id='p1')
+        refresher = first.http_client.token_refresher = mock.Mock()
+        with mock.patch.object(v1_client.Client, 'close') as mock_close:
+            pool.get(ENDPOINT % 'p2', project_id='p2')
+        self.assertFalse(mock_close.called)
+        self.assertFalse(refresher.stop.called)
+        del first
+        gc.collect()
+        refresher.stop.assert_called_once_with(wait=False)
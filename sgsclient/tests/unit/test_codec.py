@@ -0,0 +1,41 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import datetime
+
+from sgsclient.common import codec
+from sgsclient.tests.unit import base
+
+
+class CodecTest(base.TestCaseShell):
+
+    def test_stdlib_backend_always_available(self):
+        self.assertIn('json', codec.available_backends())
+
+    def test_unknown_backend(self):
+        self.assertRaises(ValueError, codec.get_codec, 'marshal')
+
+    def test_round_trip_all_backends(self):
+        body = {'volume': {'id': '1', 'name': u'volé', 'size': 1,
+                           'metadata': {}, 'attachments': [None]}}
+        for name in codec.available_backends():
+            json_codec = codec.get_codec(name)
+            encoded = json_codec.dumps(body)
+            self.assertIsInstance(encoded, bytes)
+            self.assertEqual(body, json_codec.loads(encoded))
+            self.assertEqual(body, json_codec.loads(memoryview(encoded)))
+
+    def test_dumps_datetime(self):
+        when = datetime.datetime(2016, 11, 1, 8, 0, 0)
+        for name in codec.available_backends():
+            encoded = codec.get_codec(name).dumps({'created_at': when})
+            self.assertIn(b'2016-11-01', encoded)
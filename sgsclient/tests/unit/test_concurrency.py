@@ -0,0 +1,113 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Stress tests of one client shared by many threads, against a local server.
+"""
+
+import threading
+
+import mock
+
+from sgsclient.common import auth
+from sgsclient.tests.unit import base
+from sgsclient.tests.unit import fakes
+from sgsclient.v1 import client
+from sgsclient.v1 import volumes
+
+THREADS = 8
+CALLS = 10
+
+
+def run_threads(target, count=THREADS):
+    errors = []
+
+    def run():
+        try:
+            target()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(count)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return errors
+
+
+class SharedClientStressTest(base.TestCaseShell):
+
+    def setUp(self):
+        super(SharedClientStressTest, self).setUp()
+        self.server = self.useFixture(fakes.FakeSGSServerFixture()).server
+
+    def _client(self, **kwargs):
+        kwargs.setdefault('token', 'token')
+        cs = client.Client(self.server.endpoint, **kwargs)
+        self.addCleanup(cs.close)
+        return cs
+
+    def test_concurrent_list_and_get(self):
+        cs = self._client()
+
+        def work():
+            for i in range(CALLS):
+                volume_id = 'vol-%d' % (i % len(fakes.VOLUMES))
+                self.assertEqual(fakes.VOLUMES[volume_id],
+                                 cs.volumes.get(volume_id).to_dict())
+                self.assertEqual(len(fakes.VOLUMES),
+                                 len(cs.volumes.list(detailed=True)))
+
+        self.assertEqual([], run_threads(work))
+        self.assertEqual(THREADS * CALLS, self.server.requests[
+            ('GET', '/v1/fake/volumes/detail')])
+
+    def test_lazy_load_is_single_flight(self):
+        cs = self._client()
+        volume = volumes.Volume(cs.volumes, {'id': 'vol-3'})
+
+        def work():
+            self.assertEqual('volume3', volume.name)
+            self.assertRaises(AttributeError, getattr, volume, 'missing')
+
+        self.assertEqual([], run_threads(work))
+        self.assertEqual(1, self.server.requests[
+            ('GET', '/v1/fake/volumes/vol-3')])
+
+    def test_compression_stats_are_exact(self):
+        cs = self._client(compress_requests=True, compression_threshold=64)
+
+        def work():
+            for i in range(CALLS):
+                cs.volumes.update('vol-1', {'description': 'x' * 1024})
+
+        self.assertEqual([], run_threads(work))
+        stats = cs.http_client.get_compression_stats()
+        self.assertEqual(THREADS * CALLS, stats['requests_compressed'])
+
+    def test_concurrent_401s_reauthenticate_once(self):
+        self.server.valid_tokens = set(['token2'])
+        tokens = iter(['token1', 'token2'])
+        plugin = mock.Mock()
+        plugin.get_access.side_effect = lambda session: mock.Mock(
+            auth_token=next(tokens), expires=None,
+            **{'will_expire_soon.return_value': False})
+        provider = auth.TokenProvider(plugin, mock.Mock())
+        cs = self._client(token=None, token_provider=provider)
+
+        def work():
+            for i in range(CALLS):
+                cs.volumes.get('vol-1')
+
+        self.assertEqual([], run_threads(work))
+        self.assertEqual(2, plugin.get_access.call_count)
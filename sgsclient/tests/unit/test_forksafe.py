@@ -0,0 +1,161 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import copy
+import multiprocessing
+import os
+import pickle
+import time
+
+import mock
+import requests
+import testtools
+
+from sgsclient.common import forksafe
+from sgsclient.common import http
+from sgsclient.tests.unit import base
+from sgsclient.tests.unit import test_concurrency
+from sgsclient.tests.unit import fakes as unit_fakes
+from sgsclient.tests.unit.v1 import fakes
+from sgsclient.v1 import client
+from sgsclient.v1 import volumes
+
+ENDPOINT = 'http://sgs.example.com:8975/v1/fake'
+
+# Client inherited by the workers of the process pool test.
+_client = None
+
+
+def _get_volume(volume_id):
+    return os.getpid(), _client.volumes.get(volume_id)
+
+
+def no_content_response():
+    resp = requests.Response()
+    resp.status_code = 204
+    resp._content = b''
+    resp._content_consumed = True
+    resp.raw = mock.Mock(version=11)
+    return resp
+
+
+def fork():
+    """Pretend that the code after this call runs in a forked child."""
+    return mock.patch('os.getpid', return_value=os.getpid() + 100000)
+
+
+class SessionForProcessTest(base.TestCaseShell):
+
+    def test_replacement_shared_and_configured(self):
+        session = requests.Session()
+        session.headers['X-Test'] = 'yes'
+        with fork():
+            first = forksafe.session_for_process(session)
+            self.assertIs(first, forksafe.session_for_process(session))
+        self.assertIsNot(session, first)
+        self.assertEqual('yes', first.headers['X-Test'])
+        self.assertIsNot(session.adapters['http://'],
+                         first.adapters['http://'])
+
+
+class HTTPClientForkTest(base.TestCaseShell):
+
+    @mock.patch('requests.Session.request')
+    def test_new_connections_after_fork(self, mock_request):
+        mock_request.return_value = no_content_response()
+        shared = requests.Session()
+        one = http.HTTPClient(ENDPOINT, token='token', http=shared)
+        two = http.HTTPClient(ENDPOINT, token='token', http=shared)
+        one.raw_request('DELETE', '/volumes/1')
+        self.assertIs(shared, one.http)
+        with fork():
+            one.raw_request('DELETE', '/volumes/1')
+            two.raw_request('DELETE', '/volumes/1')
+        self.assertIsNot(shared, one.http)
+        self.assertIs(one.http, two.http)
+
+    def test_session_client_after_fork(self):
+        session = mock.Mock(session=requests.Session())
+        session.request.return_value = no_content_response()
+        inherited = session.session
+        cs = http.SessionClient(session=session)
+        lock = cs._reauth_lock
+        with fork():
+            cs.raw_request('DELETE', '/volumes/1')
+        self.assertIsNot(inherited, session.session)
+        self.assertIsNot(lock, cs._reauth_lock)
+
+    def test_after_fork_runs_once_across_threads(self):
+        calls = []
+
+        class Shared(forksafe.ProcessLocal):
+            def _after_fork(self):
+                calls.append(None)
+                # Let the other threads catch up with this one.
+                time.sleep(0.05)
+
+        shared = Shared()
+        shared._check_pid()
+        with fork():
+            self.assertEqual([], test_concurrency.run_threads(
+                shared._check_pid, 8))
+        self.assertEqual(1, len(calls))
+
+
+class ResourcePickleTest(base.TestCaseShell):
+
+    def test_manager_not_pickled(self):
+        cs = fakes.FakeClient()
+        volume = volumes.Volume(cs.volumes, {'id': '1', 'name': 'vol'},
+                                loaded=True)
+        volume.status = 'enabled'
+        data = pickle.dumps(volume, pickle.HIGHEST_PROTOCOL)
+        self.assertNotIn(b'FakeHTTPClient', data)
+        unpickled = pickle.loads(data)
+        self.assertIsNone(unpickled.manager)
+        self.assertEqual(volume, unpickled)
+        self.assertEqual('enabled', unpickled.status)
+        self.assertTrue(unpickled.is_loaded())
+
+    def test_copies_keep_the_manager(self):
+        cs = fakes.FakeClient()
+        volume = volumes.Volume(cs.volumes, {'id': '1', 'tags': ['a']},
+                                loaded=True)
+        volume.name = 'renamed'
+        for copied in (copy.copy(volume), copy.deepcopy(volume)):
+            self.assertIs(cs.volumes, copied.manager)
+            self.assertEqual({'name': 'renamed'}, copied.changes())
+            self.assertTrue(copied.is_loaded())
+        self.assertIs(volume.tags, copy.copy(volume).tags)
+        deep = copy.deepcopy(volume)
+        self.assertIsNot(volume.tags, deep.tags)
+        self.assertIs(deep.tags, deep._info['tags'])
+
+
+@testtools.skipUnless(hasattr(multiprocessing, 'get_context') and
+                      hasattr(os, 'fork'), 'requires fork()')
+class ProcessPoolTest(base.TestCaseShell):
+
+    def test_client_shared_with_forked_workers(self):
+        global _client
+        server = self.useFixture(unit_fakes.FakeSGSServerFixture()).server
+
+        _client = client.Client(server.endpoint, token='token')
+        # Open a pooled connection that the workers inherit.
+        _client.volumes.get('vol-0')
+        pool = multiprocessing.get_context('fork').Pool(2)
+        self.addCleanup(pool.terminate)
+        results = pool.map(_get_volume, sorted(unit_fakes.VOLUMES))
+        self.assertNotIn(os.getpid(), [pid for pid, volume in results])
+        self.assertEqual(sorted(unit_fakes.VOLUMES),
+                         [volume.id for pid, volume in results])
+        self.assertEqual('volume0', _client.volumes.get('vol-0').name)
@@ -0,0 +1,351 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import io
+import zlib
+
+import mock
+import requests
+from requests import structures
+
+from sgsclient.common import auth
+from sgsclient.common import http
+from sgsclient.openstack.common.apiclient import exceptions as exc
+from sgsclient.tests.unit import base
+
+ENDPOINT = 'http://sgs.example.com:8975/v1/fake'
+
+
+def fake_response(status_code=200, content=b'', headers=None):
+    resp = requests.Response()
+    resp.status_code = status_code
+    resp.reason = 'OK'
+    resp._content = content
+    resp._content_consumed = True
+    resp.headers = structures.CaseInsensitiveDict(headers or {})
+    resp.raw = mock.Mock(version=11)
+    return resp
+
+
+class HTTPClientCompressionTest(base.TestCaseShell):
+
+    @mock.patch('requests.Session.request')
+    def test_accept_encoding_is_negotiated(self, mock_request):
+        mock_request.return_value = fake_response(
+            content=b'{}', headers={'Content-Type': 'application/json'})
+        client = http.HTTPClient(ENDPOINT, token='token')
+        client.json_request('GET', '/volumes')
+        headers = mock_request.call_args[1]['headers']
+        self.assertEqual(http.ACCEPT_ENCODING, headers['Accept-Encoding'])
+
+    @mock.patch('requests.Session.request')
+    def test_small_body_is_not_compressed(self, mock_request):
+        mock_request.return_value = fake_response(status_code=202)
+        client = http.HTTPClient(ENDPOINT, token='token',
+                                 compress_requests=True)
+        client.json_request('POST', '/volumes/1/action',
+                            data={'enable': None})
+        headers = mock_request.call_args[1]['headers']
+        self.assertNotIn('Content-Encoding', headers)
+        self.assertEqual(0, client.get_compression_stats()[
+            'requests_compressed'])
+
+    @mock.patch('requests.Session.request')
+    def test_large_body_is_gzipped(self, mock_request):
+        mock_request.return_value = fake_response(status_code=202)
+        client = http.HTTPClient(ENDPOINT, token='token',
+                                 compress_requests=True,
+                                 compression_threshold=64)
+        data = {'volume': {'description': 'x' * 1024}}
+        client.json_request('PUT', '/volumes/1', data=data)
+        kwargs = mock_request.call_args[1]
+        self.assertEqual('gzip', kwargs['headers']['Content-Encoding'])
+        sent = zlib.decompress(kwargs['data'], 16 + zlib.MAX_WBITS)
+        self.assertIn(b'xxxx', sent)
+        stats = client.get_compression_stats()
+        self.assertEqual(1, stats['requests_compressed'])
+        self.assertEqual(len(sent) - len(kwargs['data']),
+                         stats['request_bytes_saved'])
+
+    @mock.patch('requests.Session.request')
+    def test_response_bytes_saved(self, mock_request):
+        content = b'{"volumes": []}' + b' ' * 100
+        mock_request.return_value = fake_response(
+            content=content,
+            headers={'Content-Type': 'application/json',
+                     'Content-Encoding': 'gzip',
+                     'Content-Length': '30'})
+        client = http.HTTPClient(ENDPOINT, token='token')
+        client.json_request('GET', '/volumes')
+        stats = client.get_compression_stats()
+        self.assertEqual(1, stats['responses_compressed'])
+        self.assertEqual(len(content) - 30, stats['response_bytes_saved'])
+        client.reset_compression_stats()
+        self.assertEqual(0, client.get_compression_stats()[
+            'response_bytes_saved'])
+
+
+class HTTPClientPreEncodedBodyTest(base.TestCaseShell):
+
+    @mock.patch('requests.Session.request')
+    def test_pre_encoded_body_sent_unchanged(self, mock_request):
+        mock_request.return_value = fake_response(status_code=202)
+        client = http.HTTPClient(ENDPOINT, token='token')
+        body = b'{"enable_replicate": null}'
+        for data in (body, bytearray(body), memoryview(body)):
+            client.json_request('POST', '/volume_replicate/1/action',
+                                data=data)
+            self.assertEqual(body, mock_request.call_args[1]['data'])
+
+
+class HTTPClientHeadersTest(base.TestCaseShell):
+
+    @mock.patch('requests.Session.request')
+    def test_template_rebuilt_on_token_change(self, mock_request):
+        mock_request.return_value = fake_response(status_code=204)
+        client = http.HTTPClient(ENDPOINT, token='token1',
+                                 region_name='RegionOne')
+        caller_headers = {'X-Configuration-Session': 'session'}
+        client.raw_request('DELETE', '/volumes/1', headers=caller_headers)
+        headers = mock_request.call_args[1]['headers']
+        self.assertEqual('token1', headers['X-Auth-Token'])
+        self.assertEqual('RegionOne', headers['X-Region-Name'])
+        self.assertEqual('session', headers['X-Configuration-Session'])
+        self.assertEqual({'X-Configuration-Session': 'session'},
+                         caller_headers)
+
+        template = client._header_template()
+        client.raw_request('DELETE', '/volumes/2')
+        self.assertIs(template[0], client._header_template()[0])
+
+        client.auth_token = 'token2'
+        client.raw_request('DELETE', '/volumes/3')
+        headers = mock_request.call_args[1]['headers']
+        self.assertEqual('token2', headers['X-Auth-Token'])
+
+    @mock.patch('requests.Session.request')
+    def test_credentials_override_caller_headers(self, mock_request):
+        mock_request.return_value = fake_response(status_code=204)
+        client = http.HTTPClient(ENDPOINT, username='user',
+                                 password='pass')
+        client.raw_request('DELETE', '/volumes/1',
+                           headers={'X-Auth-User': 'other'})
+        headers = mock_request.call_args[1]['headers']
+        self.assertEqual('user', headers['X-Auth-User'])
+        self.assertEqual('pass', headers['X-Auth-Key'])
+
+
+class HTTPClientTokenExchangeTest(base.TestCaseShell):
+
+    def _provider(self, *tokens):
+        access = [mock.Mock(auth_token=t, expires=None,
+                            **{'will_expire_soon.return_value': False})
+                  for t in tokens]
+        plugin = mock.Mock(**{'get_access.side_effect': access})
+        return auth.TokenProvider(plugin, mock.Mock()), plugin
+
+    @mock.patch('requests.Session.request')
+    def test_credentials_exchanged_once(self, mock_request):
+        mock_request.return_value = fake_response(status_code=204)
+        provider, plugin = self._provider('token1')
+        client = http.HTTPClient(ENDPOINT, username='user', password='pass',
+                                 token_provider=provider)
+        client.raw_request('DELETE', '/volumes/1')
+        client.raw_request('DELETE', '/volumes/2')
+        headers = mock_request.call_args[1]['headers']
+        self.assertEqual('token1', headers['X-Auth-Token'])
+        self.assertNotIn('X-Auth-Key', headers)
+        self.assertEqual(1, plugin.get_access.call_count)
+
+    @mock.patch('requests.Session.request')
+    def test_reauthenticate_on_401(self, mock_request):
+        mock_request.side_effect = [fake_response(status_code=401),
+                                    fake_response(status_code=204)]
+        provider, plugin = self._provider('token1', 'token2')
+        client = http.HTTPClient(ENDPOINT, username='user', password='pass',
+                                 token_provider=provider)
+        client.raw_request('DELETE', '/volumes/1')
+        self.assertEqual(2, mock_request.call_count)
+        headers = mock_request.call_args[1]['headers']
+        self.assertEqual('token2', headers['X-Auth-Token'])
+        self.assertTrue(plugin.invalidate.called)
+
+    @mock.patch('requests.Session.request')
+    def test_token_kept_per_request(self, mock_request):
+        mock_request.return_value = fake_response(status_code=204)
+        provider, plugin = self._provider('token1')
+        client = http.HTTPClient(ENDPOINT, token_provider=provider)
+        client.raw_request('DELETE', '/volumes/1')
+        self.assertEqual('token1',
+                         mock_request.call_args[1]['headers']['X-Auth-Token'])
+        # Other threads never see the token of this request.
+        self.assertIsNone(client.auth_token)
+
+    @mock.patch('requests.Session.request')
+    def test_retry_after_401_keeps_follow_redirects(self, mock_request):
+        redirect = fake_response(status_code=302, headers={
+            'location': ENDPOINT + '/volumes/2'})
+        mock_request.side_effect = [fake_response(status_code=401),
+                                    redirect]
+        provider, plugin = self._provider('token1', 'token2')
+        client = http.HTTPClient(ENDPOINT, token_provider=provider)
+        resp = client.raw_request('DELETE', '/volumes/1',
+                                  follow_redirects=False)
+        self.assertIs(redirect, resp)
+        self.assertEqual(2, mock_request.call_count)
+
+    @mock.patch('requests.Session.request')
+    def test_second_401_is_raised(self, mock_request):
+        mock_request.return_value = fake_response(status_code=401)
+        provider, plugin = self._provider('token1', 'token2')
+        client = http.HTTPClient(ENDPOINT, username='user', password='pass',
+                                 token_provider=provider)
+        self.assertRaises(exc.AuthorizationFailure,
+                          client.raw_request, 'DELETE', '/volumes/1')
+        self.assertEqual(2, mock_request.call_count)
+
+    @mock.patch('requests.Session.request')
+    def test_streamed_body_is_not_resent_after_401(self, mock_request):
+        mock_request.return_value = fake_response(status_code=401)
+        provider, plugin = self._provider('token1', 'token2')
+        client = http.HTTPClient(ENDPOINT, token_provider=provider)
+        self.assertRaises(exc.AuthorizationFailure, client.raw_request,
+                          'PUT', '/backups/1', data=io.BytesIO(b"data"))
+        self.assertEqual(1, mock_request.call_count)
+        # The next request gets a new token.
+        self.assertTrue(plugin.invalidate.called)
+
+
+class HTTPClientLoggingTest(base.TestCaseShell):
+
+    def setUp(self):
+        super(HTTPClientLoggingTest, self).setUp()
+        patcher = mock.patch('requests.Session.request')
+        self.mock_request = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.mock_request.return_value = fake_response(status_code=204)
+
+    @mock.patch.object(http.HTTPClient, 'log_http_response')
+    @mock.patch.object(http.HTTPClient, 'log_curl_request')
+    def test_no_formatting_without_debug(self, mock_curl, mock_resp):
+        client = http.HTTPClient(ENDPOINT, token='token')
+        with mock.patch.object(http.LOG, 'isEnabledFor', return_value=False):
+            client.raw_request('DELETE', '/volumes/1')
+        self.assertFalse(mock_curl.called)
+        self.assertFalse(mock_resp.called)
+
+    @mock.patch.object(http.HTTPClient, 'log_http_response')
+    @mock.patch.object(http.HTTPClient, 'log_curl_request')
+    def test_sampled_logging(self, mock_curl, mock_resp):
+        client = http.HTTPClient(ENDPOINT, token='token', log_sample_rate=3)
+        with mock.patch.object(http.LOG, 'isEnabledFor', return_value=True):
+            for i in range(6):
+                client.raw_request('DELETE', '/volumes/%d' % i)
+        self.assertEqual(2, mock_curl.call_count)
+        self.assertEqual(2, mock_resp.call_count)
+
+    def test_response_body_truncated(self):
+        resp = fake_response(content=b'{"volumes": [1, 2, 3]}')
+        with mock.patch.object(http.LOG, 'debug') as mock_debug:
+            http.HTTPClient.log_http_response(resp, body_max=5)
+        self.assertIn('{"vol', mock_debug.call_args[0][0])
+        self.assertNotIn('[1, 2, 3]', mock_debug.call_args[0][0])
+
+
+class SessionClientLoggingTest(base.TestCaseShell):
+
+    def setUp(self):
+        super(SessionClientLoggingTest, self).setUp()
+        self.session = mock.Mock()
+        self.session.request.return_value = fake_response(
+            content=b'{"volumes": [1, 2, 3]}')
+
+    def _client(self, **kwargs):
+        return http.SessionClient(session=self.session, **kwargs)
+
+    def test_bodies_truncated(self):
+        client = self._client(log_body_max=5)
+        with mock.patch.object(http.KS_SESSION_LOG, 'isEnabledFor',
+                               return_value=True):
+            with mock.patch.object(http.KS_SESSION_LOG,
+                                   'debug') as mock_debug:
+                client.json_request('PUT', '/volumes/1',
+                                    data={'volume': {'name': 'n' * 20}})
+        # keystoneclient would log the full bodies.
+        self.assertFalse(self.session.request.call_args[1]['log'])
+        request, response = [c[0][0] for c in mock_debug.call_args_list]
+        self.assertEqual('REQ: PUT /volumes/1 {"vol', request)
+        self.assertIn('{"vol', response)
+        self.assertNotIn('[1, 2, 3]', response)
+
+    def test_truncated_logs_on_the_adapter_logger(self):
+        logger = mock.Mock(**{'isEnabledFor.return_value': True})
+        client = self._client(log_body_max=5, logger=logger)
+        with mock.patch.object(http.LOG, 'debug') as mock_debug:
+            client.raw_request('DELETE', '/volumes/1')
+        self.assertEqual(2, logger.debug.call_count)
+        self.assertFalse(mock_debug.called)
+
+    def test_sampled_logging(self):
+        client = self._client(log_sample_rate=3)
+        with mock.patch.object(http.KS_SESSION_LOG, 'isEnabledFor',
+                               return_value=True):
+            for i in range(6):
+                client.raw_request('DELETE', '/volumes/%d' % i)
+        self.assertEqual([True, False, False, True, False, False],
+                         [c[1]['log'] for c in
+                          self.session.request.call_args_list])
+
+    def test_no_logging_without_debug(self):
+        client = self._client(log_body_max=5)
+        logger = mock.Mock(**{'isEnabledFor.return_value': False})
+        client.logger = logger
+        # Only the logger that would get the logs decides.
+        with mock.patch.object(http.LOG, 'isEnabledFor', return_value=True):
+            with mock.patch.object(http.LOG, 'debug') as mock_debug:
+                client.raw_request('DELETE', '/volumes/1')
+        self.assertFalse(self.session.request.call_args[1]['log'])
+        self.assertFalse(mock_debug.called)
+        self.assertFalse(logger.debug.called)
+
+
+class HTTPClientStreamingTest(base.TestCaseShell):
+
+    @mock.patch('requests.Session.request')
+    def test_streamed_download(self, mock_request):
+        payload = b'x' * (http.CHUNKSIZE * 2 + 10)
+        resp = requests.Response()
+        resp.status_code = 200
+        resp.raw = io.BytesIO(payload)
+        resp.raw.version = 11
+        mock_request.return_value = resp
+        client = http.HTTPClient(ENDPOINT, token='token')
+        with mock.patch.object(http.LOG, 'isEnabledFor', return_value=True):
+            resp = client.raw_request('GET', '/volumes/1/export',
+                                      stream=True)
+        self.assertTrue(mock_request.call_args[1]['stream'])
+        # Logging must not have buffered the body.
+        self.assertFalse(resp._content_consumed)
+        chunks = list(http.iter_chunks(resp))
+        self.assertEqual([http.CHUNKSIZE, http.CHUNKSIZE, 10],
+                         [len(c) for c in chunks])
+        self.assertEqual(payload, b''.join(chunks))
+
+    @mock.patch('requests.Session.request')
+    def test_file_upload_is_chunked(self, mock_request):
+        mock_request.return_value = fake_response(status_code=202)
+        client = http.HTTPClient(ENDPOINT, token='token')
+        payload = b'y' * (http.CHUNKSIZE + 1)
+        client.raw_request('PUT', '/volumes/1/metadata',
+                           data=io.BytesIO(payload))
+        data = mock_request.call_args[1]['data']
+        self.assertEqual([http.CHUNKSIZE, 1], [len(c) for c in data])
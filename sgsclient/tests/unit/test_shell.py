@@ -0,0 +1,109 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import fixtures
+import mock
+
+from sgsclient.common import cache
+from sgsclient import shell
+from sgsclient.tests.unit import base
+from sgsclient.tests.unit import test_cache
+
+AUTH_KWARGS = {
+    'username': 'user', 'user_id': None, 'password': 'pass',
+    'user_domain_id': None, 'user_domain_name': None,
+    'project_id': 'p1', 'project_name': None,
+    'project_domain_id': None, 'project_domain_name': None,
+}
+
+
+class ShellKeystoneAuthTest(base.TestCaseShell):
+
+    def setUp(self):
+        super(ShellKeystoneAuthTest, self).setUp()
+        self.token_cache = cache.TokenCache(
+            self.useFixture(fixtures.TempDir()).path)
+        self.shell = shell.SGServiceShell()
+
+    @mock.patch('keystoneclient.discover.Discover')
+    def test_cached_token_skips_keystone(self, mock_discover):
+        auth_ref = test_cache.v3_access(3600)
+        self.shell._save_keystone_auth(self.token_cache,
+                                       mock.Mock(auth_ref=auth_ref),
+                                       test_cache.AUTH_URL, **AUTH_KWARGS)
+        auth = self.shell._get_keystone_auth(
+            mock.Mock(), test_cache.AUTH_URL, token_cache=self.token_cache,
+            **AUTH_KWARGS)
+        self.assertFalse(mock_discover.called)
+        self.assertEqual('token-1', auth.get_token(mock.Mock()))
+
+    @mock.patch('keystoneclient.discover.Discover')
+    def test_discovery_cached(self, mock_discover):
+        mock_discover.return_value.url_for.side_effect = [
+            None, test_cache.AUTH_URL]
+        discovery_cache = cache.FileCache('discovery',
+                                          self.token_cache.cache.path)
+        for i in range(2):
+            versions = self.shell._discover_auth_versions(
+                mock.Mock(), test_cache.AUTH_URL,
+                discovery_cache=discovery_cache)
+            self.assertEqual((None, test_cache.AUTH_URL), versions)
+        self.assertEqual(1, mock_discover.call_count)
+
+    @mock.patch('keystoneclient.discover.Discover')
+    def test_pinned_identity_version(self, mock_discover):
+        versions = self.shell._discover_auth_versions(
+            mock.Mock(), test_cache.AUTH_URL, identity_api_version='3')
+        self.assertEqual((None, test_cache.AUTH_URL), versions)
+        versions = self.shell._discover_auth_versions(
+            mock.Mock(), test_cache.AUTH_URL, identity_api_version='2.0')
+        self.assertEqual((test_cache.AUTH_URL, None), versions)
+        self.assertFalse(mock_discover.called)
+
+    def test_pinned_identity_version_skips_plugin_discovery(self):
+        session = mock.Mock()
+        session.post.return_value.headers = {'X-Subject-Token': 'token-1'}
+        session.post.return_value.json.return_value = {'token': {
+            'expires_at': '2099-01-01T00:00:00.000000Z',
+            'methods': ['password'], 'catalog': []}}
+        auth = self.shell._get_keystone_auth(
+            session, 'http://keystone.example.com:5000',
+            identity_api_version='3', **AUTH_KWARGS)
+        self.assertEqual('token-1', auth.get_token(session))
+        self.assertFalse(session.get.called)
+        self.assertEqual('http://keystone.example.com:5000/v3/auth/tokens',
+                         session.post.call_args[0][0])
+
+        auth = self.shell._get_keystone_auth(
+            session, 'http://keystone.example.com:5000/',
+            identity_api_version='2.0', **AUTH_KWARGS)
+        self.assertEqual('http://keystone.example.com:5000/v2.0',
+                         auth.auth_url)
+
+    def test_endpoint_cached_per_region(self):
+        endpoint_cache = cache.FileCache('endpoints',
+                                         self.token_cache.cache.path)
+        keystone_auth = mock.Mock()
+        keystone_auth.get_endpoint.side_effect = [
+            'http://sgs-one:8975/v1/p1', 'http://sgs-two:8975/v1/p1']
+        args = mock.Mock(os_auth_url=test_cache.AUTH_URL,
+                         os_service_type='sg-service',
+                         os_endpoint_type='publicURL')
+        for region, expected in (('RegionOne', 'http://sgs-one:8975/v1/p1'),
+                                 ('RegionTwo', 'http://sgs-two:8975/v1/p1'),
+                                 ('RegionOne', 'http://sgs-one:8975/v1/p1')):
+            args.os_region_name = region
+            endpoint = self.shell._get_endpoint(mock.Mock(), keystone_auth,
+                                                args, endpoint_cache,
+                                                **AUTH_KWARGS)
+            self.assertEqual(expected, endpoint)
+        self.assertEqual(2, keystone_auth.get_endpoint.call_count)
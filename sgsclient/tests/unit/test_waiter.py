@@ -0,0 +1,104 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from concurrent import futures
+
+import mock
+
+from sgsclient.common import waiter
+from sgsclient.openstack.common.apiclient import exceptions as exc
+from sgsclient.tests.unit import base
+from sgsclient.tests.unit import fakes
+from sgsclient.v1 import client
+
+
+class StatusWaiterTest(base.TestCaseShell):
+
+    def setUp(self):
+        super(StatusWaiterTest, self).setUp()
+        self.server = self.useFixture(fakes.FakeSGSServerFixture()).server
+        self.backups = dict(('bak-%d' % i, {'id': 'bak-%d' % i,
+                                            'status': 'creating'})
+                            for i in range(6))
+        self.server.resources = {'backups': self.backups}
+        self.client = client.Client(self.server.endpoint, token='token')
+        self.rounds = [
+            {},
+            {'bak-0': 'available', 'bak-1': 'error'},
+            {},
+            {},
+            {'bak-2': 'available'},
+        ]
+
+        patcher = mock.patch.object(waiter, 'time')
+        self.mock_time = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.now = 1000.0
+        self.delays = []
+        self.mock_time.time.side_effect = lambda: self.now
+        self.mock_time.sleep.side_effect = self._next_round
+
+    def _next_round(self, delay):
+        self.delays.append(delay)
+        self.now += delay
+        for rid, status in (self.rounds.pop(0) if self.rounds else {}).items():
+            if status is None:
+                del self.backups[rid]
+            else:
+                self.backups[rid]['status'] = status
+
+    def test_batched_rounds(self):
+        status_waiter = waiter.StatusWaiter(
+            self.client.backups, 'backups', ['bak-0', 'bak-1', 'bak-2'],
+            ['available'], interval=2, limit=4)
+        status_waiter.run()
+        results = status_waiter.futures
+        self.assertEqual('available', results['bak-0'].result().status)
+        self.assertIsInstance(results['bak-1'].exception(),
+                              waiter.ResourceInErrorState)
+        self.assertEqual('bak-2', results['bak-2'].result().id)
+        # Rounds without progress back off, progress resets the interval.
+        self.assertEqual([2, 3.0, 2, 2, 3.0], self.delays)
+        # Each round is one listing of two pages and an empty one.
+        self.assertEqual(18, sum(self.server.requests.values()))
+
+    def test_deleted_and_timeout(self):
+        self.rounds = [{'bak-3': None}]
+        results = self.client.backups.wait_for_status(
+            ['bak-3', 'bak-4'], ['deleted'], timeout=10)
+        done, not_done = futures.wait(list(results.values()), timeout=5)
+        self.assertEqual(set(), not_done)
+        self.assertIsNone(results['bak-3'].result())
+        self.assertIsInstance(results['bak-4'].exception(),
+                              waiter.WaitTimeout)
+        self.assertEqual(10, sum(self.delays))
+
+    def test_missing_resource_fails(self):
+        status_waiter = waiter.StatusWaiter(
+            self.client.backups, 'backups', ['bak-9'], ['available'])
+        status_waiter.run()
+        self.assertIsInstance(status_waiter.futures['bak-9'].exception(),
+                              exc.NotFound)
+        self.assertEqual([], self.delays)
+
+    def test_retry_after_honored(self):
+        status_waiter = waiter.StatusWaiter(
+            self.client.backups, 'backups', ['bak-0'], ['available'])
+        error = exc.ServiceUnavailable(
+            response=mock.Mock(headers={'retry-after': '7'}))
+        available = [{'id': 'bak-0', 'status': 'available'}]
+        with mock.patch.object(status_waiter, '_list',
+                               side_effect=[error, (available, None)]):
+            status_waiter.run()
+        self.assertEqual('available',
+                         status_waiter.futures['bak-0'].result().status)
+        self.assertEqual([7.0], self.delays)
@@ -0,0 +1,75 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+import mock
+
+from sgsclient.common import watch
+from sgsclient.tests.unit import base
+from sgsclient.tests.unit import fakes
+from sgsclient.v1 import client
+
+
+def _volume(i, status='enabled', updated_at='2016-11-01T08:00:00'):
+    return {'id': 'vol-%d' % i, 'status': status, 'updated_at': updated_at}
+
+
+class WatcherTest(base.TestCaseShell):
+
+    def setUp(self):
+        super(WatcherTest, self).setUp()
+        self.server = self.useFixture(fakes.FakeSGSServerFixture()).server
+        self.volumes = dict(('vol-%d' % i, _volume(i)) for i in range(5))
+        self.server.resources = {'volumes': self.volumes}
+        self.client = client.Client(self.server.endpoint, token='token')
+
+    def _churn(self):
+        self.volumes['vol-1'] = _volume(1, 'disabled', '2016-11-02')
+        self.volumes['vol-7'] = _volume(7, updated_at='2016-11-02')
+        self.volumes['vol-3'] = _volume(3, 'deleted', '2016-11-02')
+
+    def _events(self, events):
+        return sorted((e.type, e.resource.id) for e in events)
+
+    def test_changes_since(self):
+        watcher = watch.Watcher(self.client.volumes, 'volumes')
+        self.assertEqual([], watcher.poll())
+        self._churn()
+        self.server.requests.clear()
+        self.assertEqual([(watch.ADDED, 'vol-7'), (watch.CHANGED, 'vol-1'),
+                          (watch.DELETED, 'vol-3')],
+                         self._events(watcher.poll()))
+        self.assertTrue(all('changes-since' in path
+                            for (method, path) in self.server.requests))
+        self.assertEqual([], watcher.poll())
+
+    def test_digests_without_server_support(self):
+        for volume in self.volumes.values():
+            del volume['updated_at']
+        watcher = watch.Watcher(self.client.volumes, 'volumes',
+                                initial=True)
+        self.assertEqual(5, len(watcher.poll()))
+        self.volumes['vol-1']['status'] = 'disabled'
+        del self.volumes['vol-4']
+        self.assertEqual([(watch.CHANGED, 'vol-1'),
+                          (watch.DELETED, 'vol-4')],
+                         self._events(watcher.poll()))
+        self.assertFalse(watcher.changes_since)
+
+    @mock.patch('time.sleep')
+    def test_manager_watch(self, mock_sleep):
+        mock_sleep.side_effect = lambda interval: self._churn()
+        events = self.client.volumes.watch(interval=5)
+        event = next(events)
+        self.assertEqual(watch.CHANGED, event.type)
+        self.assertEqual('disabled', event.resource.status)
+        mock_sleep.assert_called_once_with(5)
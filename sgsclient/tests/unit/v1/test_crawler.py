@@ -0,0 +1,110 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+
+import testtools
+
+from sgsclient.tests.unit import base
+from sgsclient.tests.unit import fakes
+from sgsclient.v1 import client
+from sgsclient.v1 import crawler
+from sgsclient.v1 import snapshots
+from sgsclient.v1 import volumes
+
+SNAPSHOTS = dict(('snap-%02d' % i, {'id': 'snap-%02d' % i,
+                                    'volume_id': 'vol-%d' % (i % 10),
+                                    'status': 'available' if i % 3 else
+                                    'error'})
+                 for i in range(25))
+
+
+class CrawlerTest(base.TestCaseShell):
+
+    def setUp(self):
+        super(CrawlerTest, self).setUp()
+        self.server = self.useFixture(fakes.FakeSGSServerFixture()).server
+        self.server.resources = {'volumes': fakes.VOLUMES,
+                                 'snapshots': SNAPSHOTS}
+        self.client = client.Client(self.server.endpoint, token='token')
+
+    def _crawl(self, **kwargs):
+        kwargs.setdefault('resource_types', ('volumes', 'snapshots'))
+        return crawler.Crawler(self.client, **kwargs).crawl()
+
+    def test_crawl_in_process(self):
+        result = self._crawl(processes=0, page_size=4)
+        self.assertEqual(sorted(fakes.VOLUMES),
+                         sorted(v.id for v in result['volumes']))
+        self.assertEqual(sorted(SNAPSHOTS),
+                         [s.id for s in result['snapshots']])
+        self.assertIsInstance(result['snapshots'][0], snapshots.Snapshot)
+        self.assertTrue(result['snapshots'][0].is_loaded())
+        # 7 pages of snapshots and the empty page that ends the shard.
+        pages = [path for (method, path) in self.server.requests
+                 if path.startswith('/v1/fake/snapshots/detail')]
+        self.assertEqual(8, len(pages))
+
+    def test_partitions_and_fields(self):
+        result = self._crawl(processes=0, partitions={'snapshots': [
+            {'status': 'available'}, {'status': 'error'},
+            {'volume_id': 'vol-1'}]}, fields=['status'])
+        self.assertEqual(sorted(SNAPSHOTS),
+                         sorted(s.id for s in result['snapshots']))
+        self.assertEqual({'id': 'snap-01', 'status': 'available'},
+                         [s for s in result['snapshots']
+                          if s.id == 'snap-01'][0].to_dict())
+
+    @testtools.skipUnless(hasattr(os, 'fork'), 'requires fork()')
+    def test_crawl_with_process_pool(self):
+        result = self._crawl(processes=2, page_size=3, partitions={
+            'volumes': [{'status': 'enabled'}, {'status': 'disabled'}]})
+        self.assertEqual(sorted(fakes.VOLUMES),
+                         sorted(v.id for v in result['volumes']))
+        self.assertIsInstance(result['volumes'][0], volumes.Volume)
+        self.assertIs(self.client.volumes, result['volumes'][0].manager)
+        self.assertEqual(len(SNAPSHOTS), len(result['snapshots']))
+
+    def test_split_into_id_ranges(self):
+        shards = crawler.Crawler(self.client, resource_types=['snapshots'],
+                                 page_size=10, splits=3).shards()
+        self.assertEqual([(None, 'snap-08'), ('snap-08', 'snap-17'),
+                          ('snap-17', None)],
+                         [(s.marker, s.end) for s in shards])
+        self.server.requests.clear()
+        pages = [list(crawler.iter_shard_pages(self.client, shard, 4))
+                 for shard in shards]
+        ids = [info['id'] for shard_pages in pages for page in shard_pages
+               for info in crawler.from_columnar(page)]
+        self.assertEqual(sorted(SNAPSHOTS), ids)
+        # The first two ranges stop at their last ID without asking for
+        # an empty page.
+        self.assertEqual([3, 3, 2], [len(p) for p in pages])
+        self.assertEqual(9, sum(self.server.requests.values()))
+
+    def test_columnar(self):
+        page = [{'id': '1', 'status': 'ok'}, {'id': '2', 'status': 'error'},
+                {'id': '3'}]
+        groups = crawler.columnar(page)
+        self.assertEqual([(('id', 'status'), [('1', 'ok'), ('2', 'error')]),
+                          (('id',), [('3',)])], groups)
+        self.assertEqual(page, crawler.from_columnar(groups))
+
+    @testtools.skipUnless(hasattr(os, 'fork'), 'requires fork()')
+    def test_pool_streams_pages_and_splits(self):
+        pages = list(crawler.Crawler(self.client, processes=2, page_size=4,
+                                     resource_types=['snapshots'],
+                                     splits=2).iter_pages())
+        self.assertEqual(7, len(pages))
+        self.assertEqual(sorted(SNAPSHOTS),
+                         sorted(info['id'] for resource_type, page in pages
+                                for info in page))
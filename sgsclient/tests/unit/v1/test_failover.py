@@ -0,0 +1,102 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from concurrent import futures
+import threading
+
+import mock
+
+from sgsclient.common import waiter
+from sgsclient.openstack.common.apiclient import exceptions as exc
+from sgsclient.tests.unit import base
+from sgsclient.v1 import failover
+
+
+def _resolved(exception=None):
+    future = futures.Future()
+    if exception is not None:
+        future.set_exception(exception)
+    else:
+        future.set_result(mock.Mock())
+    return future
+
+
+class FailoverTest(base.TestCaseShell):
+
+    def setUp(self):
+        super(FailoverTest, self).setUp()
+        patcher = mock.patch.object(failover.time, 'sleep')
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = mock.Mock()
+        self.requested = []
+        self.lock = threading.Lock()
+        self.failures = {}
+        self.client.replications.failover.side_effect = self._failover
+        self.client.replications.wait_for_status.side_effect = self._wait
+
+    def _failover(self, rid):
+        with self.lock:
+            self.requested.append(rid)
+            errors = self.failures.get(rid)
+            if errors:
+                raise errors.pop(0)
+
+    def _wait(self, ids, target_states, timeout, error_states):
+        self.waited = list(ids)
+        in_error = mock.Mock(id='rep-2', status='error')
+        outcomes = {'rep-2': waiter.ResourceInErrorState(in_error),
+                    'rep-3': waiter.WaitTimeout('too slow')}
+        return dict((rid, _resolved(outcomes.get(rid))) for rid in ids)
+
+    def test_run(self):
+        self.failures = {'rep-1': [exc.HttpServerError(),
+                                   exc.RequestTimeout()],
+                         'rep-4': [exc.Forbidden()]}
+        report = failover.Failover(
+            self.client, ['rep-0', 'rep-1', 'rep-2', 'rep-3', 'rep-4'],
+            priority={'rep-3': -1}, max_concurrency=1).run()
+
+        self.assertEqual(['rep-3', 'rep-0', 'rep-1', 'rep-1', 'rep-1',
+                          'rep-2', 'rep-4'], self.requested)
+        self.assertEqual([mock.call(1), mock.call(2)],
+                         self.sleep.call_args_list)
+        self.assertEqual(['rep-3', 'rep-0', 'rep-1', 'rep-2'], self.waited)
+        self.assertEqual(
+            [('rep-3', 'timeout', 1), ('rep-0', 'succeeded', 1),
+             ('rep-1', 'succeeded', 3), ('rep-2', 'error', 1),
+             ('rep-4', 'request-failed', 1)],
+            [(r.id, r.outcome, r.attempts) for r in report.results])
+        self.assertIsNone(report.results[-1].requested)
+        self.assertEqual({'succeeded': 2, 'error': 1, 'timeout': 1,
+                          'request-failed': 1}, report.summary())
+        self.assertEqual(['rep-0', 'rep-1'],
+                         [r.id for r in report.succeeded])
+        self.assertEqual(5, len(report.to_dict()['results']))
+
+    def test_retries_exhausted(self):
+        self.failures = {'rep-0': [exc.HttpServerError()] * 3}
+        report = failover.Failover(self.client, ['rep-0'], retries=2).run()
+        self.assertEqual(3, len(self.requested))
+        self.assertEqual([('rep-0', 'request-failed', 3)],
+                         [(r.id, r.outcome, r.attempts)
+                          for r in report.results])
+        self.assertFalse(self.client.replications.wait_for_status.called)
+
+    def test_per_volume(self):
+        self.client.volumes.wait_for_status.side_effect = self._wait
+        report = failover.Failover(self.client, [mock.Mock(id='vol-1')],
+                                   per_volume=True,
+                                   target_states=['enabled']).run()
+        self.client.replicates.failover.assert_called_once_with('vol-1')
+        self.assertFalse(self.client.replications.failover.called)
+        self.assertEqual(['vol-1'], [r.id for r in report.succeeded])
@@ -0,0 +1,96 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+
+import fixtures
+
+from sgsclient.tests.unit import base
+from sgsclient.tests.unit import fakes
+from sgsclient.v1 import client
+from sgsclient.v1 import mirror
+from sgsclient.v1 import replications
+
+
+class MirrorTest(base.TestCaseShell):
+
+    def setUp(self):
+        super(MirrorTest, self).setUp()
+        fixture = self.useFixture(fakes.FakeReplicationsFixture())
+        self.server = fixture.server
+        self.replications = fixture.replications
+        cs = client.Client(self.server.endpoint, token='token')
+        path = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                            'cache', 'mirror.sqlite')
+        self.mirror = mirror.Mirror(cs, path=path, page_size=2,
+                                    resource_types=['replications'])
+        self.addCleanup(self.mirror.close)
+
+    def _listed(self):
+        return [path for (method, path) in self.server.requests]
+
+    def test_full_sync_and_lookups(self):
+        self.assertEqual({'replications': 5}, self.mirror.sync())
+        rep = self.mirror.get('replications', 'rep-2')
+        self.assertIsInstance(rep, replications.Replication)
+        self.assertEqual('vol-7', rep.slave_volume)
+        self.assertIsNone(self.mirror.get('replications', 'rep-9'))
+        self.assertEqual(['rep-3'], [r.id for r in self.mirror.find(
+            'replications', volume_id='vol-8')])
+        self.assertEqual(['rep-1'], [r.id for r in self.mirror.find(
+            'replications', name='rep1', status='enabled')])
+        self.assertIsNotNone(self.mirror.last_synced('replications'))
+
+    def test_incremental_sync(self):
+        self.mirror.sync()
+        self.replications['rep-1'] = dict(fakes.replication(1, '2016-11-02'),
+                                          status='failed-over')
+        self.replications['rep-3'] = dict(fakes.replication(3, '2016-11-02'),
+                                          status='deleted')
+        self.server.requests.clear()
+        self.mirror.sync()
+        self.assertTrue(all('changes-since=2016-11-01T08%3A00%3A00' in path
+                            for path in self._listed()))
+        self.assertEqual(['rep-1'], [r.id for r in self.mirror.find(
+            'replications', status='failed-over')])
+        self.assertIsNone(self.mirror.get('replications', 'rep-3'))
+
+    def test_full_sync_drops_missing(self):
+        self.mirror.sync()
+        del self.replications['rep-4']
+        self.mirror.sync(full=True)
+        self.assertIsNone(self.mirror.get('replications', 'rep-4'))
+        self.assertEqual(4, len(self.mirror.find('replications')))
+
+    def test_purged_resources_dropped_when_filter_ignored(self):
+        self.server.supports_changes_since = False
+        self.replications['rep-0'] = fakes.replication(0, '2016-10-01')
+        self.mirror.sync()
+        self.replications['rep-1'] = fakes.replication(1, '2016-11-02')
+        del self.replications['rep-4']
+        self.mirror.sync()
+        self.assertIsNone(self.mirror.get('replications', 'rep-4'))
+        self.assertEqual(4, len(self.mirror.find('replications')))
+
+    def test_periodic_full_sync(self):
+        self.mirror.full_every = 3
+        self.mirror.sync()
+        self.replications['rep-1'] = fakes.replication(1, '2016-11-02')
+        del self.replications['rep-4']
+        self.mirror.sync()
+        # Only changes were listed: the purge went unnoticed.
+        self.assertIsNotNone(self.mirror.get('replications', 'rep-4'))
+        self.server.requests.clear()
+        self.mirror.sync()
+        self.assertFalse(any('changes-since' in path
+                             for path in self._listed()))
+        self.assertIsNone(self.mirror.get('replications', 'rep-4'))
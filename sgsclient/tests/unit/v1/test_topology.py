@@ -0,0 +1,92 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+from sgsclient.tests.unit import base
+from sgsclient.tests.unit import fakes
+from sgsclient.v1 import client
+from sgsclient.v1 import replications
+from sgsclient.v1 import topology
+from sgsclient.v1 import volumes
+
+
+class TopologyTest(base.TestCaseShell):
+
+    def setUp(self):
+        super(TopologyTest, self).setUp()
+        fixture = self.useFixture(fakes.FakeReplicationsFixture())
+        self.server = fixture.server
+        self.replications = fixture.replications
+        cs = client.Client(self.server.endpoint, token='token')
+        self.topology = topology.Topology(cs, page_size=3)
+
+    def test_lookups(self):
+        self.assertEqual({'replications': 5, 'volumes': 10},
+                         self.topology.refresh())
+        self.server.requests.clear()
+        rep = self.topology.replication_of('vol-7')
+        self.assertIsInstance(rep, replications.Replication)
+        self.assertEqual('rep-2', rep.id)
+        self.assertIsNone(self.topology.replication_of('vol-missing'))
+        self.assertEqual(['vol-3'], self.topology.peers('vol-8'))
+        self.assertEqual(5, len(self.topology.pairs('enabled')))
+        self.assertEqual([], self.topology.pairs('failed-over'))
+        self.assertIsInstance(self.topology.volume('vol-2'), volumes.Volume)
+        self.assertEqual({'enabled': 5}, self.topology.statuses())
+        self.assertEqual({}, dict(self.server.requests))
+
+    def test_incremental_refresh(self):
+        self.topology.refresh()
+        self.replications['rep-1'] = dict(
+            fakes.replication(1, '2016-11-02', status='failed-over'),
+            slave_volume='vol-9')
+        self.replications['rep-3'] = fakes.replication(3, '2016-11-02',
+                                                       status='deleted')
+        self.server.requests.clear()
+        self.topology.refresh()
+        self.assertTrue(all('changes-since=2016-11-01T08%3A00%3A00' in path
+                            for method, path in self.server.requests
+                            if '/replications' in path))
+        self.assertEqual(['rep-1'],
+                         [r.id for r in self.topology.pairs('failed-over')])
+        self.assertEqual([], self.topology.peers('vol-6'))
+        self.assertEqual(['vol-1', 'vol-4'], self.topology.peers('vol-9'))
+        self.assertIsNone(self.topology.replication_of('vol-3'))
+        self.assertEqual(4, len(self.topology))
+
+    def test_full_refresh_drops_missing(self):
+        self.topology.refresh()
+        del self.replications['rep-4']
+        self.topology.refresh(full=True)
+        self.assertIsNone(self.topology.replication('rep-4'))
+        self.assertEqual([], self.topology.peers('vol-9'))
+        self.assertEqual(4, len(self.topology.pairs()))
+
+    def test_purged_replications_dropped(self):
+        self.server.supports_changes_since = False
+        self.replications['rep-0'] = fakes.replication(0, '2016-10-01')
+        self.topology.refresh()
+        self.replications['rep-1'] = fakes.replication(1, '2016-11-02')
+        del self.replications['rep-4']
+        self.topology.refresh()
+        self.assertIsNone(self.topology.replication('rep-4'))
+        self.assertEqual([], self.topology.peers('vol-9'))
+
+    def test_periodic_full_refresh(self):
+        self.topology.full_every = 2
+        self.topology.refresh()
+        del self.replications['rep-4']
+        self.server.requests.clear()
+        self.topology.refresh()
+        self.assertFalse(any('changes-since' in path
+                             for method, path in self.server.requests))
+        self.assertIsNone(self.topology.replication('rep-4'))
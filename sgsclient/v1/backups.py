@@ -20,6 +20,7 @@ class Backup(base.Resource):
 
 class BackupManager(base.ManagerWithFind):
     resource_class = Backup
+    resource_type = "backups"
 
     def create(self, volume_id, name=None, description=None):
         body = {'backup': {"volume_id": volume_id,
@@ -29,7 +30,7 @@ class BackupManager(base.ManagerWithFind):
         return self._create(url, body, 'backup')
 
     def list(self, detailed=False, search_opts=None, marker=None, limit=None,
-             sort_key=None, sort_dir=None, sort=None):
+             sort_key=None, sort_dir=None, sort=None, fields=None):
         """Lists all backups.
 
         :param detailed: Whether to return detailed volume info.
@@ -41,6 +42,7 @@ class BackupManager(base.ManagerWithFind):
         :param sort_dir: Sort direction, should be 'desc' or 'asc'; deprecated
                          in kilo
         :param sort: Sort information
+        :param fields: Only return these attributes of the backups.
         :rtype: list of :class:`Backup`
         """
         resource_type = "backups"
@@ -48,8 +50,8 @@ class BackupManager(base.ManagerWithFind):
             resource_type, detailed=detailed,
             search_opts=search_opts, marker=marker,
             limit=limit, sort_key=sort_key,
-            sort_dir=sort_dir, sort=sort)
-        return self._list(url, 'backups')
+            sort_dir=sort_dir, sort=sort, fields=fields)
+        return self._list(url, 'backups', fields=fields)
 
     def update(self, backup_id, data):
         body = {"backup": data}
@@ -62,14 +64,15 @@ class BackupManager(base.ManagerWithFind):
             backup_id=backup_id)
         return self._delete(path)
 
-    def get(self, backup_id, session_id=None):
+    def get(self, backup_id, session_id=None, fields=None):
         if session_id:
             headers = {'X-Configuration-Session': session_id}
         else:
             headers = {}
         url = "/backups/{backup_id}".format(
             backup_id=backup_id)
-        return self._get(url, response_key="backup", headers=headers)
+        return self._get(url, response_key="backup", headers=headers,
+                         fields=fields)
 
     def restore(self, backup_id, volume_id):
         url = "/backups/{backup_id}/restore".format(
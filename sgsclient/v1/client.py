@@ -12,6 +12,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from sgsclient.common import base
 from sgsclient.common import http
 from sgsclient.v1 import backups
 from sgsclient.v1 import replicates
@@ -26,13 +27,28 @@ class Client(object):
     :param string token: Token for authentication.
     :param integer timeout: Allows customization of the timeout for client
                             http requests. (optional)
+    :param bool identity_map: Materialize each resource only once, updating
+                              that instance in place when it is fetched
+                              again. (optional)
+    :param string lazy_load: How resources of non-detailed listings load
+                             missing attributes: 'never', 'batch' (one
+                             detailed listing for all of them) or
+                             'per-item' (one GET each). (optional)
     """
 
     def __init__(self, *args, **kwargs):
         """Initialize a new client for the sgs v1 API."""
+        identity_map = kwargs.pop('identity_map', False)
+        lazy_load = kwargs.pop('lazy_load', base.LAZY_LOAD_NEVER)
         self.http_client = http._construct_http_client(*args, **kwargs)
-        self.replications = replications.ReplicationManager(self.http_client)
-        self.volumes = volumes.VolumeManager(self.http_client)
-        self.replicates = replicates.ReplicateManager(self.http_client)
-        self.backups = backups.BackupManager(self.http_client)
-        self.snapshots = snapshots.SnapshotManager(self.http_client)
+        self.identity_map = base.IdentityMap() if identity_map else None
+        manager_args = (self.http_client, self.identity_map, lazy_load)
+        self.replications = replications.ReplicationManager(*manager_args)
+        self.volumes = volumes.VolumeManager(*manager_args)
+        self.replicates = replicates.ReplicateManager(*manager_args)
+        self.backups = backups.BackupManager(*manager_args)
+        self.snapshots = snapshots.SnapshotManager(*manager_args)
+
+    def close(self):
+        """Release the connections held by this client."""
+        self.http_client.close()
@@ -0,0 +1,268 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Crawl the whole sgs inventory with a pool of worker processes.
+
+The listing work is cut into shards, one per resource type and search_opts
+partition, optionally split further into ranges of IDs. Each worker walks
+the pages of a shard with marker pagination, decodes them and sends every
+page back as soon as it has it, in columnar form: the attribute names once
+and a tuple of values per resource. Unpickling that costs the parent a
+fraction of decoding the JSON response again.
+"""
+
+import collections
+import multiprocessing
+import pickle
+
+from oslo_log import log as logging
+from six.moves import queue as six_queue
+
+from sgsclient.openstack.common.apiclient import exceptions as exc
+
+LOG = logging.getLogger(__name__)
+
+RESOURCE_TYPES = ('volumes', 'snapshots', 'backups', 'replications')
+PAGE_SIZE = 1000
+# Seconds between two checks that the workers are still alive.
+POLL_INTERVAL = 1
+
+# A shard lists the resources matching search_opts after the ID marker,
+# exclusive, up to the ID end, inclusive; None for either end of the list.
+Shard = collections.namedtuple('Shard', ['resource_type', 'search_opts',
+                                         'marker', 'end'])
+Shard.__new__.__defaults__ = (None, None)
+
+# Worker process state, set by _init_worker().
+_worker_client = None
+_worker_queue = None
+
+
+def _init_worker(client, results):
+    global _worker_client, _worker_queue
+    _worker_client = client
+    _worker_queue = results
+
+
+def _crawl_shard(args):
+    shard, page_size, fields = args
+    try:
+        for page in iter_shard_pages(_worker_client, shard, page_size,
+                                     fields):
+            _worker_queue.put((shard, page))
+    except Exception as e:
+        try:
+            pickle.dumps(e)
+        except Exception:
+            e = exc.ClientException("Crawling %s failed: %s" % (shard, e))
+        _worker_queue.put((shard, e))
+    else:
+        # The end of the shard.
+        _worker_queue.put((shard, None))
+
+
+def columnar(page):
+    """Return a page of resource dicts as (names, rows) groups.
+
+    Resources with the same attributes share one tuple of names, and each
+    of them becomes a tuple of values in that order.
+    """
+    groups = collections.OrderedDict()
+    for info in page:
+        names = tuple(sorted(info))
+        rows = groups.get(names)
+        if rows is None:
+            rows = groups[names] = []
+        rows.append(tuple(info[k] for k in names))
+    return list(groups.items())
+
+
+def from_columnar(groups):
+    """Return the list of resource dicts of a :func:`columnar` page."""
+    return [dict(zip(names, row)) for names, rows in groups for row in rows]
+
+
+def iter_shard_pages(client, shard, page_size=PAGE_SIZE, fields=None):
+    """Yield the pages of a shard in :func:`columnar` form.
+
+    Shards are listed in the order of the IDs, which ranges of IDs rely on.
+
+    :param client: v1 client
+    :param shard: the :class:`Shard` to list
+    :param page_size: number of resources to request per page
+    :param fields: only keep these attributes of the resources
+    """
+    manager = getattr(client, shard.resource_type)
+    for page in manager._iter_pages(shard.resource_type,
+                                    search_opts=shard.search_opts,
+                                    marker=shard.marker, limit=page_size,
+                                    sort='id:asc', fields=fields):
+        ids = [info['id'] for info in page]
+        if shard.end in ids:
+            yield columnar(page[:ids.index(shard.end) + 1])
+            break
+        yield columnar(page)
+
+
+def split_shard(client, shard, count, page_size=PAGE_SIZE):
+    """Split a shard into about ``count`` ranges of as many IDs each.
+
+    The IDs are listed first, alone, which is much lighter than listing
+    the resources. Ranges end at existing IDs rather than at computed
+    boundaries: markers must be IDs of existing resources.
+    """
+    if count <= 1:
+        return [shard]
+    ids = []
+    for groups in iter_shard_pages(client, shard, page_size,
+                                   fields=['id']):
+        ids.extend(row[0] for names, rows in groups for row in rows)
+    return _ranges(shard, ids, count)
+
+
+def _ranges(shard, ids, count):
+    size = -(-len(ids) // count)
+    if size == 0:
+        return [shard]
+    ranges = []
+    marker = shard.marker
+    for start in range(0, len(ids), size):
+        end = ids[min(start + size, len(ids)) - 1]
+        ranges.append(shard._replace(marker=marker, end=end))
+        marker = end
+    # Resources created after the last listed ID.
+    ranges[-1] = ranges[-1]._replace(end=shard.end)
+    return ranges
+
+
+class Crawler(object):
+    """List every resource of several types across worker processes.
+
+    The workers inherit ``client`` through fork() and replace its
+    connections with their own. Where fork() is not available, or with
+    ``processes=0``, the shards are crawled in the calling process.
+
+    :param client: v1 client
+    :param processes: number of worker processes, defaults to the number
+                      of CPUs
+    :param resource_types: names of the managers to crawl
+    :param partitions: dict of resource type to a list of search_opts
+                       dicts; each one is crawled as a separate shard,
+                       e.g. ``{'volumes': [{'status': 'enabled'},
+                       {'status': 'disabled'}]}``
+    :param page_size: number of resources to request per page
+    :param fields: only keep these attributes of the resources
+    :param splits: split each shard into that many ranges of IDs, after
+                   listing its IDs; pays off when a few shards hold most
+                   of the resources
+    """
+
+    def __init__(self, client, processes=None, resource_types=RESOURCE_TYPES,
+                 partitions=None, page_size=PAGE_SIZE, fields=None,
+                 splits=1):
+        self.client = client
+        self.processes = processes
+        self.resource_types = tuple(resource_types)
+        self.partitions = partitions or {}
+        self.page_size = page_size
+        self.fields = fields
+        self.splits = splits
+
+    def shards(self):
+        shards = [Shard(resource_type, search_opts)
+                  for resource_type in self.resource_types
+                  for search_opts in (self.partitions.get(resource_type) or
+                                      [None])]
+        if self.splits > 1:
+            shards = [r for shard in shards
+                      for r in split_shard(self.client, shard, self.splits,
+                                           self.page_size)]
+        return shards
+
+    def _context(self):
+        try:
+            return multiprocessing.get_context('fork')
+        except AttributeError:
+            # Python 2 always forks on POSIX.
+            return multiprocessing
+        except ValueError:
+            return None
+
+    def iter_columnar(self):
+        """Yield (resource type, :func:`columnar` page) per page.
+
+        Pages arrive as the workers produce them, in no particular order.
+        """
+        tasks = [(shard, self.page_size, self.fields)
+                 for shard in self.shards()]
+        context = self._context() if self.processes != 0 else None
+        LOG.debug("Crawling %d shards %s", len(tasks),
+                  'in-process' if context is None else 'with a process pool')
+        if context is None:
+            for shard, page_size, fields in tasks:
+                for page in iter_shard_pages(self.client, shard, page_size,
+                                             fields):
+                    yield shard.resource_type, page
+            return
+
+        results = context.Queue()
+        pool = context.Pool(self.processes, _init_worker,
+                            (self.client, results))
+        try:
+            pending = [pool.apply_async(_crawl_shard, (task,))
+                       for task in tasks]
+            remaining = len(tasks)
+            while remaining:
+                try:
+                    shard, page = results.get(timeout=POLL_INTERVAL)
+                except six_queue.Empty:
+                    for result in pending:
+                        # Only failures outside of _crawl_shard's handler.
+                        if result.ready() and not result.successful():
+                            result.get()
+                    continue
+                if page is None:
+                    remaining -= 1
+                elif isinstance(page, Exception):
+                    raise page
+                else:
+                    yield shard.resource_type, page
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+
+    def iter_pages(self):
+        """Yield (resource type, list of resource dicts) per page.
+
+        Pages arrive as the workers produce them, in no particular order.
+        """
+        for resource_type, page in self.iter_columnar():
+            yield resource_type, from_columnar(page)
+
+    def crawl(self):
+        """Return a dict of resource type to the list of its resources.
+
+        Resources listed by more than one shard are only returned once.
+        """
+        results = collections.OrderedDict(
+            (resource_type, collections.OrderedDict())
+            for resource_type in self.resource_types)
+        for resource_type, page in self.iter_pages():
+            manager = getattr(self.client, resource_type)
+            found = results[resource_type]
+            for info in page:
+                found[info['id']] = manager._make_resource(info,
+                                                           loaded=True)
+        return dict((resource_type, list(found.values()))
+                    for resource_type, found in results.items())
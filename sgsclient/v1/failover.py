@@ -0,0 +1,190 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Fail over many replications at once, for disaster recovery.
+"""
+
+import collections
+from concurrent import futures
+import time
+
+from oslo_log import log as logging
+
+from sgsclient.common import base
+from sgsclient.common import waiter
+from sgsclient.openstack.common.apiclient import exceptions as exc
+
+LOG = logging.getLogger(__name__)
+
+# Number of failover requests in flight at the same time.
+MAX_CONCURRENCY = 8
+TARGET_STATES = ('failed-over',)
+# Further attempts of a failover request failing with a transient error,
+# RETRY_DELAY seconds apart, doubling after each attempt.
+RETRIES = 3
+RETRY_DELAY = 1
+
+SUCCEEDED = 'succeeded'
+ERROR = 'error'
+TIMEOUT = 'timeout'
+NOT_FOUND = 'not-found'
+REQUEST_FAILED = 'request-failed'
+
+Result = collections.namedtuple('Result', [
+    'id', 'outcome', 'attempts', 'requested', 'finished', 'error'])
+Result.__doc__ = """Outcome of the failover of one replication or volume.
+
+``requested`` and ``finished`` are seconds since the start of the run:
+when the failover request was accepted, and when the target status, an
+error or the timeout was reached. ``requested`` is None if no request
+was accepted.
+"""
+
+
+class Report(object):
+    """Timed results of a :class:`Failover` run, in priority order."""
+
+    def __init__(self, started, results):
+        self.started = started
+        self.results = results
+        self.elapsed = max([r.finished for r in results] or [0])
+
+    @property
+    def succeeded(self):
+        return [r for r in self.results if r.outcome == SUCCEEDED]
+
+    @property
+    def failed(self):
+        return [r for r in self.results if r.outcome != SUCCEEDED]
+
+    def summary(self):
+        """Return a dict of outcome to number of results."""
+        return dict(collections.Counter(r.outcome for r in self.results))
+
+    def to_dict(self):
+        return {'started': self.started, 'elapsed': self.elapsed,
+                'summary': self.summary(),
+                'results': [r._asdict() for r in self.results]}
+
+
+def _outcome(error):
+    if error is None:
+        return SUCCEEDED
+    if isinstance(error, waiter.ResourceInErrorState):
+        return ERROR
+    if isinstance(error, waiter.WaitTimeout):
+        return TIMEOUT
+    if isinstance(error, exc.NotFound):
+        return NOT_FOUND
+    return REQUEST_FAILED
+
+
+class Failover(object):
+    """Fail over replications concurrently and wait for all of them.
+
+    Failover requests are sent in priority order, at most
+    ``max_concurrency`` at a time, and retried on transient errors. The
+    replications whose request was accepted are then waited for together,
+    with a single listing per polling round.
+
+    :param client: v1 client
+    :param ids: replications to fail over, as IDs or resources; volume IDs
+                with ``per_volume``
+    :param priority: dict of ID to priority, 0 if missing, or a function
+                     of the ID returning it; lower priorities go first,
+                     and ties keep the order of ``ids``
+    :param per_volume: fail over the replication of each volume through
+                       ``client.replicates`` and wait for the volumes
+    :param target_states: statuses reached once failed over
+    :param timeout: seconds to wait for the target statuses
+    """
+
+    def __init__(self, client, ids, priority=None, per_volume=False,
+                 max_concurrency=MAX_CONCURRENCY, target_states=TARGET_STATES,
+                 error_states=waiter.ERROR_STATES,
+                 timeout=waiter.WAIT_TIMEOUT, retries=RETRIES,
+                 retry_delay=RETRY_DELAY):
+        self.client = client
+        self.ids = [base.getid(i) for i in ids]
+        self.priority = priority
+        self.per_volume = per_volume
+        self.max_concurrency = max_concurrency
+        self.target_states = target_states
+        self.error_states = error_states
+        self.timeout = timeout
+        self.retries = retries
+        self.retry_delay = retry_delay
+        if per_volume:
+            self._action_manager = client.replicates
+            self._status_manager = client.volumes
+        else:
+            self._action_manager = self._status_manager = client.replications
+
+    def ordered(self):
+        """Return the IDs in the order their failovers are requested."""
+        if self.priority is None:
+            return list(self.ids)
+        if isinstance(self.priority, dict):
+            return sorted(self.ids, key=lambda i: self.priority.get(i, 0))
+        return sorted(self.ids, key=self.priority)
+
+    def _request(self, rid, started):
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                self._action_manager.failover(rid)
+                return attempt, time.time() - started, None
+            except waiter.TRANSIENT_ERRORS as e:
+                if attempt > self.retries:
+                    return attempt, time.time() - started, e
+                delay = (getattr(e, 'retry_after', None) or
+                         self.retry_delay * 2 ** (attempt - 1))
+                LOG.debug("Failover of %s failed, retrying in %s seconds: "
+                          "%s", rid, delay, e)
+                time.sleep(delay)
+            except Exception as e:
+                return attempt, time.time() - started, e
+
+    def run(self):
+        """Fail over everything and return a :class:`Report`."""
+        started = time.time()
+        ordered = self.ordered()
+        with futures.ThreadPoolExecutor(max(self.max_concurrency, 1)) as ex:
+            requests = list(ex.map(lambda rid: self._request(rid, started),
+                                   ordered))
+        accepted = [rid for rid, (attempts, elapsed, error)
+                    in zip(ordered, requests) if error is None]
+        LOG.debug("%d of %d failovers accepted after %.1f seconds",
+                  len(accepted), len(ordered), time.time() - started)
+
+        finished = {}
+        waits = {}
+        if accepted:
+            waits = self._status_manager.wait_for_status(
+                accepted, self.target_states, timeout=self.timeout,
+                error_states=self.error_states)
+            rids = dict((future, rid) for rid, future in waits.items())
+            for future in futures.as_completed(rids):
+                finished[rids[future]] = time.time() - started
+
+        results = []
+        for rid, (attempts, elapsed, error) in zip(ordered, requests):
+            if error is None:
+                error = waits[rid].exception()
+                results.append(Result(rid, _outcome(error), attempts,
+                                      elapsed, finished[rid], error))
+            else:
+                results.append(Result(rid, _outcome(error), attempts, None,
+                                      elapsed, error))
+        return Report(started, results)
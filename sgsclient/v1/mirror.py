@@ -0,0 +1,220 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Local SQLite mirror of the sgs inventory.
+"""
+
+import collections
+import errno
+import os
+import sqlite3
+import threading
+import time
+
+from oslo_log import log as logging
+
+from sgsclient.common import cache
+from sgsclient.common import codec
+from sgsclient.common import watch
+
+LOG = logging.getLogger(__name__)
+
+RESOURCE_TYPES = ('volumes', 'snapshots', 'backups', 'replications')
+PAGE_SIZE = 1000
+# Statuses of resources that are gone, as reported by changes-since.
+DELETED_STATUSES = watch.DELETED_STATUSES
+# Every that many syncs of a mirror everything is listed, even when the
+# server supports changes-since, to drop resources that were purged.
+FULL_SYNC_EVERY = watch.FULL_POLL_EVERY
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS resources (
+    type TEXT NOT NULL,
+    id TEXT NOT NULL,
+    name TEXT,
+    status TEXT,
+    volume_id TEXT,
+    peer_volume_id TEXT,
+    updated_at TEXT,
+    body TEXT NOT NULL,
+    PRIMARY KEY (type, id)
+);
+CREATE INDEX IF NOT EXISTS resources_name ON resources (type, name);
+CREATE INDEX IF NOT EXISTS resources_status ON resources (type, status);
+CREATE INDEX IF NOT EXISTS resources_volume ON resources (volume_id);
+CREATE INDEX IF NOT EXISTS resources_peer ON resources (peer_volume_id);
+CREATE TABLE IF NOT EXISTS sync_state (
+    type TEXT PRIMARY KEY,
+    cursor TEXT,
+    synced_at REAL
+);
+"""
+
+
+def default_path():
+    return os.path.join(cache.default_cache_dir(), 'mirror.sqlite')
+
+
+def _row(resource_type, info):
+    # Replications point at two volumes; other resources at most at one.
+    volume_id = info.get('volume_id') or info.get('master_volume')
+    return (resource_type, info['id'], info.get('name'), info.get('status'),
+            volume_id, info.get('slave_volume'),
+            info.get('updated_at') or info.get('created_at'),
+            codec.dumps(info).decode('utf-8'))
+
+
+class Mirror(object):
+    """Opt-in local copy of the inventory, kept fresh incrementally.
+
+    :meth:`sync` lists the resources changed since the previous sync
+    with the ``changes-since`` filter, using the newest ``updated_at``
+    seen as cursor, and the first or a ``full`` sync lists everything.
+    Whenever everything was listed, including by a server that ignores
+    the filter, the resources that were not listed are dropped. Resources
+    purged without being reported as ``deleted`` are therefore only
+    dropped by full syncs: one in ``full_every`` syncs is. Lookups by id,
+    name, status and volume are answered from indexed SQLite tables
+    without any request.
+
+    :param client: v1 client used to sync
+    :param path: database file, defaults to mirror.sqlite in the sgsclient
+                 cache directory; ``':memory:'`` keeps it in memory
+    :param resource_types: names of the managers to mirror
+    :param full_every: number of syncs of this mirror between two full
+                       ones
+    """
+
+    def __init__(self, client, path=None, resource_types=RESOURCE_TYPES,
+                 page_size=PAGE_SIZE, full_every=FULL_SYNC_EVERY):
+        self.client = client
+        self.path = path or default_path()
+        self.resource_types = tuple(resource_types)
+        self.page_size = page_size
+        self.full_every = full_every
+        self._syncs = collections.Counter()
+        directory = os.path.dirname(self.path)
+        if self.path != ':memory:' and directory:
+            try:
+                os.makedirs(directory, 0o700)
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    raise
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+
+    def close(self):
+        self._db.close()
+
+    def _cursor(self, resource_type):
+        row = self._db.execute('SELECT cursor FROM sync_state WHERE type = ?',
+                               (resource_type,)).fetchone()
+        return row[0] if row else None
+
+    def sync(self, resource_types=None, full=False):
+        """Bring the mirror up to date.
+
+        :param full: list everything and drop the resources that are gone,
+                     instead of only fetching changes
+        :returns: dict of resource type to the number of rows written
+        """
+        written = {}
+        for resource_type in resource_types or self.resource_types:
+            written[resource_type] = self._sync(resource_type, full)
+        return written
+
+    def _sync(self, resource_type, full):
+        manager = getattr(self.client, resource_type)
+        with self._lock:
+            self._syncs[resource_type] += 1
+            if self._syncs[resource_type] % self.full_every == 0:
+                full = True
+            cursor = None if full else self._cursor(resource_type)
+        changes = watch.Changes(manager, resource_type, cursor,
+                                self.page_size)
+        written = 0
+        for page in changes:
+            rows = []
+            gone = []
+            for info in page:
+                if info.get('status') in DELETED_STATUSES:
+                    gone.append((resource_type, info['id']))
+                else:
+                    rows.append(_row(resource_type, info))
+            with self._lock, self._db:
+                self._db.executemany(
+                    'INSERT OR REPLACE INTO resources VALUES '
+                    '(?, ?, ?, ?, ?, ?, ?, ?)', rows)
+                self._db.executemany(
+                    'DELETE FROM resources WHERE type = ? AND id = ?', gone)
+            written += len(rows) + len(gone)
+
+        with self._lock, self._db:
+            if changes.complete:
+                # Whatever was not listed is gone.
+                stale = [(resource_type, rid) for (rid,) in self._db.execute(
+                    'SELECT id FROM resources WHERE type = ?',
+                    (resource_type,)) if rid not in changes.seen]
+                self._db.executemany(
+                    'DELETE FROM resources WHERE type = ? AND id = ?', stale)
+                written += len(stale)
+            self._db.execute('INSERT OR REPLACE INTO sync_state VALUES '
+                             '(?, ?, ?)',
+                             (resource_type, changes.newest, time.time()))
+        LOG.debug("Synced %d %s into %s", written, resource_type, self.path)
+        return written
+
+    def last_synced(self, resource_type):
+        """Return the time of the last sync of a type, or None."""
+        with self._lock:
+            row = self._db.execute(
+                'SELECT synced_at FROM sync_state WHERE type = ?',
+                (resource_type,)).fetchone()
+        return row[0] if row else None
+
+    def _resources(self, resource_type, bodies):
+        manager = getattr(self.client, resource_type)
+        return [manager._make_resource(codec.loads(body), loaded=True)
+                for (body,) in bodies]
+
+    def get(self, resource_type, resource_id):
+        """Return the mirrored resource, or None if it is not known."""
+        with self._lock:
+            found = self._db.execute(
+                'SELECT body FROM resources WHERE type = ? AND id = ?',
+                (resource_type, resource_id)).fetchall()
+        resources = self._resources(resource_type, found)
+        return resources[0] if resources else None
+
+    def find(self, resource_type, name=None, status=None, volume_id=None):
+        """Return the mirrored resources matching all the given filters.
+
+        ``volume_id`` matches the volume of snapshots and backups and
+        either volume of replications.
+        """
+        query = 'SELECT body FROM resources WHERE type = ?'
+        params = [resource_type]
+        if name is not None:
+            query += ' AND name = ?'
+            params.append(name)
+        if status is not None:
+            query += ' AND status = ?'
+            params.append(status)
+        if volume_id is not None:
+            query += ' AND (volume_id = ? OR peer_volume_id = ?)'
+            params.extend([volume_id, volume_id])
+        with self._lock:
+            found = self._db.execute(query + ' ORDER BY id',
+                                     params).fetchall()
+        return self._resources(resource_type, found)
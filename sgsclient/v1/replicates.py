@@ -40,10 +40,10 @@ class ReplicateManager(base.Manager):
     def _action(self, action, volume_id, info=None):
         """Perform a replicate "action."
         """
-        data = {action: info}
+        data = self._action_body(action, info)
         url = "/volume_replicate/{volume_id}/action".format(
             volume_id=volume_id)
         resp, body = self.api.json_request('POST', url, data=data)
 
         if body is not None:
-            return self.resource_class(self, body["volume"])
+            return self._make_resource(body["volume"])
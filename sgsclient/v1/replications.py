@@ -20,6 +20,7 @@ class Replication(base.Resource):
 
 class ReplicationManager(base.ManagerWithFind):
     resource_class = Replication
+    resource_type = "replications"
 
     def create(self, name, master_volume, slave_volume, description=None):
         body = {'replication': {'name': name,
@@ -31,7 +32,7 @@ class ReplicationManager(base.ManagerWithFind):
         return self._create(url, body, 'replication')
 
     def list(self, detailed=False, search_opts=None, marker=None, limit=None,
-             sort_key=None, sort_dir=None, sort=None):
+             sort_key=None, sort_dir=None, sort=None, fields=None):
         """Lists all replications.
 
         :param detailed: Whether to return detailed volume info.
@@ -43,6 +44,7 @@ class ReplicationManager(base.ManagerWithFind):
         :param sort_dir: Sort direction, should be 'desc' or 'asc'; deprecated
                          in kilo
         :param sort: Sort information
+        :param fields: Only return these attributes of the replications.
         :rtype: list of :class:`Replication`
         """
         resource_type = "replications"
@@ -50,8 +52,8 @@ class ReplicationManager(base.ManagerWithFind):
             resource_type, detailed=detailed,
             search_opts=search_opts, marker=marker,
             limit=limit, sort_key=sort_key,
-            sort_dir=sort_dir, sort=sort)
-        return self._list(url, 'replications')
+            sort_dir=sort_dir, sort=sort, fields=fields)
+        return self._list(url, 'replications', fields=fields)
 
     def update(self, replication_id, data):
         body = {"replication": data}
@@ -64,14 +66,15 @@ class ReplicationManager(base.ManagerWithFind):
             replication_id=replication_id)
         return self._delete(path)
 
-    def get(self, replication_id, session_id=None):
+    def get(self, replication_id, session_id=None, fields=None):
         if session_id:
             headers = {'X-Configuration-Session': session_id}
         else:
             headers = {}
         url = "/replications/{replication_id}".format(
             replication_id=replication_id)
-        return self._get(url, response_key="replication", headers=headers)
+        return self._get(url, response_key="replication", headers=headers,
+                         fields=fields)
 
     def enable(self, replication_id):
         return self._action("enable", replication_id)
@@ -88,10 +91,10 @@ class ReplicationManager(base.ManagerWithFind):
     def _action(self, action, replication_id, info=None):
         """Perform a replication "action."
         """
-        data = {action: info}
+        data = self._action_body(action, info)
         url = "/replications/{replication_id}/action".format(
             replication_id=replication_id)
         resp, body = self.api.json_request('POST', url, data=data)
 
         if body is not None:
-            return self.resource_class(self, body["replication"])
+            return self._make_resource(body["replication"])
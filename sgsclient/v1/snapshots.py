@@ -20,6 +20,7 @@ class Snapshot(base.Resource):
 
 class SnapshotManager(base.ManagerWithFind):
     resource_class = Snapshot
+    resource_type = "snapshots"
 
     def create(self, volume_id, name=None, description=None):
         body = {'snapshot': {"volume_id": volume_id,
@@ -29,7 +30,7 @@ class SnapshotManager(base.ManagerWithFind):
         return self._create(url, body, 'snapshot')
 
     def list(self, detailed=False, search_opts=None, marker=None, limit=None,
-             sort_key=None, sort_dir=None, sort=None):
+             sort_key=None, sort_dir=None, sort=None, fields=None):
         """Lists all snapshots.
 
         :param detailed: Whether to return detailed volume info.
@@ -41,6 +42,7 @@ class SnapshotManager(base.ManagerWithFind):
         :param sort_dir: Sort direction, should be 'desc' or 'asc'; deprecated
                          in kilo
         :param sort: Sort information
+        :param fields: Only return these attributes of the snapshots.
         :rtype: list of :class:`Snapshot`
         """
         resource_type = "snapshots"
@@ -48,8 +50,8 @@ class SnapshotManager(base.ManagerWithFind):
             resource_type, detailed=detailed,
             search_opts=search_opts, marker=marker,
             limit=limit, sort_key=sort_key,
-            sort_dir=sort_dir, sort=sort)
-        return self._list(url, 'snapshots')
+            sort_dir=sort_dir, sort=sort, fields=fields)
+        return self._list(url, 'snapshots', fields=fields)
 
     def update(self, snapshot_id, data):
         body = {"snapshot": data}
@@ -62,11 +64,12 @@ class SnapshotManager(base.ManagerWithFind):
             snapshot_id=snapshot_id)
         return self._delete(path)
 
-    def get(self, snapshot_id, session_id=None):
+    def get(self, snapshot_id, session_id=None, fields=None):
         if session_id:
             headers = {'X-Configuration-Session': session_id}
         else:
             headers = {}
         url = "/snapshots/{snapshot_id}".format(
             snapshot_id=snapshot_id)
-        return self._get(url, response_key="snapshot", headers=headers)
+        return self._get(url, response_key="snapshot", headers=headers,
+                         fields=fields)
@@ -0,0 +1,190 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+In-memory index of which volumes replicate to which.
+"""
+
+import collections
+import threading
+
+from oslo_log import log as logging
+
+from sgsclient.common import watch
+
+LOG = logging.getLogger(__name__)
+
+PAGE_SIZE = 1000
+# Statuses of resources that are gone, as reported by changes-since.
+DELETED_STATUSES = watch.DELETED_STATUSES
+# Every that many refreshes everything is listed, to drop resources that
+# were purged.
+FULL_REFRESH_EVERY = watch.FULL_POLL_EVERY
+
+
+class Topology(object):
+    """Replications and volumes indexed for disaster recovery planning.
+
+    The first :meth:`refresh` lists every replication and volume once, in
+    detail, page by page. Later ones only list what changed since the
+    newest ``updated_at`` seen, as :class:`sgsclient.v1.mirror.Mirror`
+    does: resources purged without being reported as ``deleted`` are
+    dropped when everything is listed, by a server ignoring the filter,
+    a ``full`` refresh, or one in ``full_every`` refreshes. Lookups are
+    dict accesses and send no request.
+
+    :param client: v1 client
+    :param page_size: number of resources to request per page
+    :param volumes: also index volumes, to return them from :meth:`volume`
+    :param full_every: number of refreshes between two full ones
+    """
+
+    def __init__(self, client, page_size=PAGE_SIZE, volumes=True,
+                 full_every=FULL_REFRESH_EVERY):
+        self.client = client
+        self.page_size = page_size
+        self.full_every = full_every
+        self._refreshes = collections.Counter()
+        self.resource_types = (('replications', 'volumes') if volumes
+                               else ('replications',))
+        self._lock = threading.RLock()
+        self._cursors = {}
+        self._infos = dict((t, {}) for t in self.resource_types)
+        # Volume ID -> IDs of the replications it is a master or slave of.
+        self._by_volume = collections.defaultdict(set)
+        # Status -> IDs of the replications in that status.
+        self._by_status = collections.defaultdict(set)
+
+    def refresh(self, full=False):
+        """Bring the index up to date.
+
+        :param full: list everything and drop what is gone, instead of
+                     only fetching changes
+        :returns: dict of resource type to the number of resources updated
+        """
+        return dict((resource_type, self._refresh(resource_type, full))
+                    for resource_type in self.resource_types)
+
+    def _refresh(self, resource_type, full):
+        with self._lock:
+            self._refreshes[resource_type] += 1
+            if self._refreshes[resource_type] % self.full_every == 0:
+                full = True
+            cursor = None if full else self._cursors.get(resource_type)
+        changes = watch.Changes(getattr(self.client, resource_type),
+                                resource_type, cursor, self.page_size)
+        updated = 0
+        for page in changes:
+            with self._lock:
+                for info in page:
+                    if info.get('status') in DELETED_STATUSES:
+                        self._remove(resource_type, info['id'])
+                    else:
+                        self._add(resource_type, info)
+                    updated += 1
+        with self._lock:
+            if changes.complete:
+                for rid in [rid for rid in self._infos[resource_type]
+                            if rid not in changes.seen]:
+                    self._remove(resource_type, rid)
+                    updated += 1
+            self._cursors[resource_type] = changes.newest
+        LOG.debug("Refreshed %d %s in the topology", updated, resource_type)
+        return updated
+
+    def _add(self, resource_type, info):
+        self._remove(resource_type, info['id'])
+        self._infos[resource_type][info['id']] = info
+        if resource_type == 'replications':
+            for volume_id in (info.get('master_volume'),
+                              info.get('slave_volume')):
+                if volume_id:
+                    self._by_volume[volume_id].add(info['id'])
+            self._by_status[info.get('status')].add(info['id'])
+
+    def _remove(self, resource_type, rid):
+        info = self._infos[resource_type].pop(rid, None)
+        if info is None or resource_type != 'replications':
+            return
+        for volume_id in (info.get('master_volume'),
+                          info.get('slave_volume')):
+            ids = self._by_volume.get(volume_id)
+            if ids is not None:
+                ids.discard(rid)
+                if not ids:
+                    del self._by_volume[volume_id]
+        ids = self._by_status.get(info.get('status'))
+        if ids is not None:
+            ids.discard(rid)
+            if not ids:
+                del self._by_status[info.get('status')]
+
+    def _resource(self, resource_type, info):
+        manager = getattr(self.client, resource_type)
+        return manager._make_resource(info, loaded=True)
+
+    def __len__(self):
+        return len(self._infos['replications'])
+
+    def replication(self, replication_id):
+        """Return the replication with this ID, or None."""
+        info = self._infos['replications'].get(replication_id)
+        return self._resource('replications', info) if info else None
+
+    def volume(self, volume_id):
+        """Return the volume with this ID, or None if it is not indexed."""
+        info = self._infos.get('volumes', {}).get(volume_id)
+        return self._resource('volumes', info) if info else None
+
+    def replications_of(self, volume_id):
+        """Return the replications a volume is the master or slave of."""
+        with self._lock:
+            infos = [self._infos['replications'][rid]
+                     for rid in sorted(self._by_volume.get(volume_id, ()))]
+        return [self._resource('replications', info) for info in infos]
+
+    def replication_of(self, volume_id):
+        """Return the replication of a volume, or None.
+
+        A volume is normally part of a single replication; use
+        :meth:`replications_of` to get all of them.
+        """
+        found = self.replications_of(volume_id)
+        return found[0] if found else None
+
+    def pairs(self, status=None):
+        """Return the replications in a status, or all of them."""
+        with self._lock:
+            if status is None:
+                rids = list(self._infos['replications'])
+            else:
+                rids = list(self._by_status.get(status, ()))
+            infos = [self._infos['replications'][rid] for rid in sorted(rids)]
+        return [self._resource('replications', info) for info in infos]
+
+    def peers(self, volume_id):
+        """Return the IDs of the volumes replicating with a volume."""
+        with self._lock:
+            peers = set()
+            for rid in self._by_volume.get(volume_id, ()):
+                info = self._infos['replications'][rid]
+                peers.update((info.get('master_volume'),
+                              info.get('slave_volume')))
+        peers.discard(volume_id)
+        peers.discard(None)
+        return sorted(peers)
+
+    def statuses(self):
+        """Return a dict of replication status to number of replications."""
+        with self._lock:
+            return dict((status, len(rids))
+                        for status, rids in self._by_status.items())
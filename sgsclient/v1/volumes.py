@@ -20,9 +20,10 @@ class Volume(base.Resource):
 
 class VolumeManager(base.ManagerWithFind):
     resource_class = Volume
+    resource_type = "volumes"
 
     def list(self, detailed=False, search_opts=None, marker=None, limit=None,
-             sort_key=None, sort_dir=None, sort=None):
+             sort_key=None, sort_dir=None, sort=None, fields=None):
         """Lists all volumes.
 
         :param detailed: Whether to return detailed volume info.
@@ -34,6 +35,7 @@ class VolumeManager(base.ManagerWithFind):
         :param sort_dir: Sort direction, should be 'desc' or 'asc'; deprecated
                          in kilo
         :param sort: Sort information
+        :param fields: Only return these attributes of the volumes.
         :rtype: list of :class:`Volume`
         """
         resource_type = "volumes"
@@ -41,8 +43,8 @@ class VolumeManager(base.ManagerWithFind):
             resource_type, detailed=detailed,
             search_opts=search_opts, marker=marker,
             limit=limit, sort_key=sort_key,
-            sort_dir=sort_dir, sort=sort)
-        return self._list(url, 'volumes')
+            sort_dir=sort_dir, sort=sort, fields=fields)
+        return self._list(url, 'volumes', fields=fields)
 
     def update(self, volume_id, data):
         body = {"volume": data}
@@ -55,14 +57,15 @@ class VolumeManager(base.ManagerWithFind):
             volume_id=volume_id)
         return self._delete(path)
 
-    def get(self, volume_id, session_id=None):
+    def get(self, volume_id, session_id=None, fields=None):
         if session_id:
             headers = {'X-Configuration-Session': session_id}
         else:
             headers = {}
         url = "/volumes/{volume_id}".format(
             volume_id=volume_id)
-        return self._get(url, response_key="volume", headers=headers)
+        return self._get(url, response_key="volume", headers=headers,
+                         fields=fields)
 
     def enable(self, volume_id):
         return self._action("enable", volume_id)
@@ -105,9 +108,9 @@ class VolumeManager(base.ManagerWithFind):
     def _action(self, action, volume_id, info=None, response_key="volume"):
         """Perform a volume "action."
         """
-        data = {action: info}
+        data = self._action_body(action, info)
         url = "/volumes/{volume_id}/action".format(volume_id=volume_id)
         resp, body = self.api.json_request('POST', url, data=data)
 
         if body is not None:
-            return self.resource_class(self, body[response_key])
+            return self._make_resource(body[response_key])
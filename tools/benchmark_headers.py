@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Measure the per-request header overhead of sgsclient.common.http.HTTPClient.
+
+Compares the former deepcopy/setdefault header building with the cached
+header template, and times a full _http_request with the network call
+stubbed out.
+
+    python tools/benchmark_headers.py [--number 100000]
+"""
+
+from __future__ import print_function
+
+import argparse
+import copy
+import timeit
+
+import mock
+
+from sgsclient.common import http
+
+
+def legacy_headers(client, headers):
+    headers = copy.deepcopy(headers)
+    headers.setdefault('User-Agent', http.USER_AGENT)
+    if client.auth_token:
+        headers.setdefault('X-Auth-Token', client.auth_token)
+    else:
+        headers.update(client.credentials_headers())
+    if client.auth_url:
+        headers.setdefault('X-Auth-Url', client.auth_url)
+    if client.region_name:
+        headers.setdefault('X-Region-Name', client.region_name)
+    return headers
+
+
+def template_headers(client, headers):
+    defaults, overrides = client._header_template()
+    result = dict(defaults)
+    result.update(headers)
+    result.update(overrides)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--number', type=int, default=100000,
+                        help='Number of requests to time.')
+    args = parser.parse_args()
+
+    client = http.HTTPClient('http://sgs.example.com:8975/v1/fake',
+                             token='a' * 32, auth_url='http://keystone/v3',
+                             region_name='RegionOne')
+    headers = {'Content-Type': 'application/json'}
+    assert legacy_headers(client, headers) == template_headers(client,
+                                                               headers)
+
+    for name, func in (('deepcopy', legacy_headers),
+                       ('template', template_headers)):
+        elapsed = timeit.timeit(lambda: func(client, headers),
+                                number=args.number)
+        print('%-10s %8.2f us/request' % (name,
+                                          elapsed * 1e6 / args.number))
+
+    resp = mock.Mock(status_code=204)
+    with mock.patch('requests.Session.request', return_value=resp):
+        elapsed = timeit.timeit(
+            lambda: client._http_request('/volumes/1/action', 'POST',
+                                         headers=headers),
+            number=args.number)
+    print('%-10s %8.2f us/request' % ('request',
+                                      elapsed * 1e6 / args.number))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Compare the installed JSON backends of sgsclient.common.codec.
+
+Encodes and decodes detailed volume and backup listings shaped like the
+ones returned by the SG-Service API.
+
+    python tools/benchmark_json.py [--items 1000] [--repeat 20]
+"""
+
+from __future__ import print_function
+
+import argparse
+import timeit
+import uuid
+
+from sgsclient.common import codec
+
+
+def volume(i):
+    return {
+        'id': str(uuid.uuid4()),
+        'name': 'volume-%05d' % i,
+        'description': 'Protected volume %d of the production site' % i,
+        'status': 'enabled' if i % 7 else 'error',
+        'replicate_status': 'enabled',
+        'replicate_mode': 'master',
+        'replication_id': str(uuid.uuid4()),
+        'peer_volume': str(uuid.uuid4()),
+        'access_mode': 'rw',
+        'size': 10 + i % 500,
+        'availability_zone': 'az-%d' % (i % 3),
+        'created_at': '2016-11-01T08:%02d:%02d.000000' % (i % 60, i % 60),
+        'updated_at': '2016-11-02T09:%02d:%02d.000000' % (i % 60, i % 60),
+        'metadata': {'tier': 'gold', 'owner': 'dr-team', 'index': str(i)},
+        'attachments': [{
+            'attachment_id': str(uuid.uuid4()),
+            'instance_uuid': str(uuid.uuid4()),
+            'mountpoint': '/dev/vdb',
+            'host_name': None,
+        }],
+    }
+
+
+def backup(i):
+    return {
+        'id': str(uuid.uuid4()),
+        'name': 'backup-%05d' % i,
+        'description': None,
+        'volume_id': str(uuid.uuid4()),
+        'status': 'available',
+        'size': 10 + i % 500,
+        'availability_zone': 'az-%d' % (i % 3),
+        'created_at': '2016-11-03T10:%02d:%02d.000000' % (i % 60, i % 60),
+        'object_count': i % 100,
+        'container': 'sgs-backups',
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--items', type=int, default=1000,
+                        help='Number of resources per listing.')
+    parser.add_argument('--repeat', type=int, default=20,
+                        help='Number of encode/decode rounds per backend.')
+    args = parser.parse_args()
+
+    payloads = {
+        'volumes': {'volumes': [volume(i) for i in range(args.items)]},
+        'backups': {'backups': [backup(i) for i in range(args.items)]},
+    }
+
+    print('%-10s %-8s %10s %12s %12s' % ('backend', 'payload', 'bytes',
+                                         'dumps (ms)', 'loads (ms)'))
+    for name in codec.available_backends():
+        json_codec = codec.get_codec(name)
+        for kind, payload in sorted(payloads.items()):
+            encoded = json_codec.dumps(payload)
+            dumps = timeit.timeit(lambda: json_codec.dumps(payload),
+                                  number=args.repeat)
+            loads = timeit.timeit(lambda: json_codec.loads(encoded),
+                                  number=args.repeat)
+            print('%-10s %-8s %10d %12.2f %12.2f' % (
+                name, kind, len(encoded),
+                dumps * 1000 / args.repeat, loads * 1000 / args.repeat))
+
+
+if __name__ == '__main__':
+    main()